@@ -328,6 +328,12 @@ export interface FormulaTimingInfo extends TimingInfo {
   tableId: string;
   colId: string;
   marks?: (TimingInfo & { name: string })[];
+  /**
+   * Hits and misses of the column's cache of values as seen by formulas (for Date, DateTime and
+   * Reference columns), if it was used.
+   */
+  cacheHits?: number;
+  cacheMisses?: number;
 }
 
 /*
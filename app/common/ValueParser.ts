@@ -346,6 +346,7 @@ export function parseUserAction(ua: UserAction, docData: DocData): UserAction {
     case "BulkAddRecord":
     case "BulkUpdateRecord":
     case "ReplaceTableData":
+    case "SyncTableData":
       return _parseUserActionColValues(ua, docData, true);
     case "AddOrUpdateRecord":
       // Parse `require` (2) and `col_values` (3). The action looks like:
@@ -2981,7 +2981,8 @@ export class ActiveDoc extends EventEmitter {
 
     let docActions: DocAction[];
     try {
-      // The last argument tells create_migrations() that only metadata is included.
+      // The last argument tells create_migrations() that only metadata is included. If migrations
+      // need the data of some user tables, the sandbox fetches those via the fetchTable export.
       docActions = await this._rawPyCall("create_migrations", tableData, true);
     } catch (e) {
       if (!/need all tables/.test(e.message)) {
@@ -3087,6 +3088,14 @@ export class ActiveDoc extends EventEmitter {
         // Calculations are not associated specifically with the user opening the document.
         // TODO: be careful with which users can create formulas.
         await this._applyUserActionsAsSystem([["Calculate"]]);
+
+        // Log the engine's work for loading and calculating the document, to help diagnose
+        // documents that are slow to open.
+        const engineCounters = await this._pyCall("get_engine_counters");
+        log.rawInfo("Calculation complete, engine counters retrieved...", {
+          ...this.getLogMeta(docSession),
+          ...engineCounters,
+        });
       }
 
       this._fullyLoaded = true;
@@ -3466,6 +3475,8 @@ export class ActiveDoc extends EventEmitter {
       sandboxOptions: {
         exports: {
           request: (key: string, args: SandboxRequest) => this._requests.handleSingleRequestWithCache(key, args),
+          // Used by migrations to fetch only the user tables they need, one at a time.
+          fetchTable: (tableName: string) => this.docStorage.fetchTable(tableName),
           guessColInfo,
           convertFromColumn,
         },
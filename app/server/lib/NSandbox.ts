@@ -1184,6 +1184,11 @@ export function getInsertedEnv(options: ISandboxOptions) {
     env.GRIST_FALSY_VALUES = process.env.GRIST_FALSY_VALUES;
   }
 
+  if (process.env.GRIST_FORMULA_WORKERS) {
+    // Number of processes the sandbox may fork to evaluate formulas of many rows.
+    env.GRIST_FORMULA_WORKERS = process.env.GRIST_FORMULA_WORKERS;
+  }
+
   return env;
 }
 
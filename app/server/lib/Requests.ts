@@ -14,6 +14,9 @@ import fromPairs from "lodash/fromPairs";
 import zipObject from "lodash/zipObject";
 import * as tmp from "tmp";
 
+// The maximum number of responses to deliver to the sandbox in one RespondToRequests action.
+const RESPONSE_BATCH_SIZE = 100;
+
 export class DocRequests {
   // Request responses are briefly cached in files only to handle multiple requests in a formula
   // and only as long as needed to finish calculating all formulas.
@@ -27,17 +30,21 @@ export class DocRequests {
     const numRequests = Object.keys(requests).length;
     this._numPending += numRequests;
     try {
-      // Perform batches of requests in parallel for speed, and hope it doesn't cause rate limiting...
-      for (const keys of chunk(Object.keys(requests), 10)) {
-        const responses: Response[] = await Promise.all(keys.map(async (key) => {
-          const request = requests[key];
-          const response = await this.handleSingleRequestWithCache(key, request);
-          return {
-            ...response,
-            // Tells the engine which cell(s) made the request and should be recalculated to use the response
-            deps: request.deps,
-          };
-        }));
+      // Deliver responses to the sandbox in batches, since each delivery recalculates formulas.
+      for (const keys of chunk(Object.keys(requests), RESPONSE_BATCH_SIZE)) {
+        const responses: Response[] = [];
+        // Perform batches of requests in parallel for speed, and hope it doesn't cause rate limiting...
+        for (const parallelKeys of chunk(keys, 10)) {
+          responses.push(...await Promise.all(parallelKeys.map(async (key) => {
+            const request = requests[key];
+            const response = await this.handleSingleRequestWithCache(key, request);
+            return {
+              ...response,
+              // Tells the engine which cell(s) made the request and should be recalculated to use the response
+              deps: request.deps,
+            };
+          })));
+        }
         // Tell the sandbox which previous responses we have cached in files.
         // This lets it know it can immediately and synchronously get those responses again.
         const cachedRequestKeys = await fse.readdir(this._cacheDir!.name);
@@ -26,11 +26,11 @@ class ActionSummary(object):
     """
     Record changes for the given table and column, in the form (row_id, before, after).
     """
-    col_deltas = self._forTable(table_id).column_deltas.setdefault(col_id, {})
-    for (row_id, before, after) in changes:
-      # If a change was already recorded, update the 'after' value and keep the 'before' one.
-      previous = col_deltas.get(row_id)
-      col_deltas[row_id] = (previous[0] if previous else before, after)
+    column_deltas = self._forTable(table_id).column_deltas
+    col_delta = column_deltas.get(col_id)
+    if col_delta is None:
+      col_delta = column_deltas[col_id] = ColumnDelta()
+    col_delta.add_changes(changes)
 
   def convert_deltas_to_actions(self, out_stored, out_undo):
     """
@@ -50,7 +50,7 @@ class ActionSummary(object):
     """
     table_delta = self._tables.get(table_id)
     col_delta = table_delta and table_delta.column_deltas.pop(col_id, None)
-    return self._changes_to_actions(table_id, col_id, col_delta or {}, out_stored, out_undo)
+    return self._changes_to_actions(table_id, col_id, col_delta, out_stored, out_undo)
 
   def update_new_rows_map(self, table_id, temp_row_ids, final_row_ids):
     """
@@ -71,13 +71,12 @@ class ActionSummary(object):
 
   def _changes_to_actions(self, table_id, col_id, column_delta, out_stored, out_undo):
     """
-    Given a column and a dict of column_deltas for it, of the form {row_id: (before_value,
-    after_value)}, creates DocActions and adds them to out_stored and out_undo lists.
+    Given a column and a ColumnDelta for it, creates DocActions and adds them to out_stored and
+    out_undo lists.
     """
     if not column_delta:
       return
-    full_row_ids = sorted(r for r, (before, after) in column_delta.items()
-                          if not equal_encoding(before, after))
+    full_row_ids = column_delta.get_changed_row_ids()
 
     defunct = is_defunct(table_id) or is_defunct(col_id)
     # The front restore (defunct branch below) is inserted at the front of the undo list, which
@@ -91,7 +90,7 @@ class ActionSummary(object):
     col_id = root_name(col_id)
 
     def update_action(filtered_row_ids, delta_index, tid=None, cid=None):
-      values = [column_delta[r][delta_index] for r in filtered_row_ids]
+      values = column_delta.get_values(filtered_row_ids, delta_index)
       return actions.BulkUpdateRecord(tid if tid is not None else table_id, filtered_row_ids,
                                       {cid if cid is not None else col_id: values}).simplify()
 
@@ -188,13 +187,80 @@ class TableDelta(object):
     self._rows_present_before = {}
     self._rows_present_after = {}
     self.column_renames = LabelRenames()
-    self.column_deltas = {}   # maps col_id to the dict {row_id: (before_value, after_value)}
+    self.column_deltas = {}   # maps col_id to ColumnDelta
 
     # Map of negative row_ids that may be used in [Bulk]AddRecord actions to the final row_ids for
     # those rows; to allow translating Reference values added in the same action bundle.
     self.temp_row_ids = {}
 
 
+class ColumnDelta(object):
+  """
+  Changes to cells of a single column, stored column-wise: parallel lists of row_ids, and of
+  values before and after the changes. Each row_id is included at most once; if it changes again,
+  its 'after' value gets updated while the 'before' value is kept.
+
+  This is cheaper than a tuple per cell when recalculations touch many cells, and allows checking
+  in bulk which cells actually changed.
+  """
+  __slots__ = ('row_ids', 'before', 'after', '_positions')
+
+  def __init__(self):
+    self.row_ids = []
+    self.before = []
+    self.after = []
+    self._positions = {}    # maps row_id to its index in the lists above
+
+  def __len__(self):
+    return len(self.row_ids)
+
+  def add_changes(self, changes):
+    """
+    Records changes given as an iterable of (row_id, before, after) tuples.
+    """
+    positions = self._positions
+    row_ids, before_values, after_values = self.row_ids, self.before, self.after
+    for (row_id, before, after) in changes:
+      pos = positions.get(row_id)
+      if pos is None:
+        positions[row_id] = len(row_ids)
+        row_ids.append(row_id)
+        before_values.append(before)
+        after_values.append(after)
+      else:
+        after_values[pos] = after
+
+  def get_changed_row_ids(self):
+    """
+    Returns the sorted list of row_ids whose 'after' value differs from the 'before' value.
+    """
+    return sorted(r for (r, before, after) in zip(self.row_ids, self.before, self.after)
+                  if not _equal_encoding(before, after))
+
+  def get_values(self, row_ids, delta_index):
+    """
+    Returns the list of 'before' (if delta_index is 0) or 'after' (if 1) values for the given
+    row_ids, all of which must be present in this delta.
+    """
+    values = self.after if delta_index else self.before
+    positions = self._positions
+    return [values[positions[r]] for r in row_ids]
+
+
+# Values of exactly these types are equal in their encoding exactly when they are equal.
+_simple_types = frozenset([str, int, type(None)])
+
+def _equal_encoding(a, b):
+  """
+  Same as objtypes.equal_encoding(), but skips encoding the values when they are of the same
+  simple type, which is by far the most common case when comparing a cell's before/after values.
+  """
+  type_a = type(a)
+  if type_a is type(b) and type_a in _simple_types:
+    return a == b
+  return equal_encoding(a, b)
+
+
 class LabelRenames(object):
   """
   Maintains a set of renames, for tables in a doc, or for columns in a table. For now, we only
@@ -522,7 +522,7 @@ class InferRecAttrAssignment(InferenceTip):
 
 #----------------------------------------------------------------------
 
-def parse_grist_names(builder):
+def parse_grist_names(builder, formulas=None):
   """
   Returns a list of tuples (col_info, start_pos, table_id, col_id):
     col_info:   (table_id, col_id) for the formula the name is found in. It is the value passed
@@ -531,6 +531,10 @@ def parse_grist_names(builder):
     table_id:   Parsed name when the tuple is for a table name; the name of the column's table
                 when the tuple is for a column name.
     col_id:     None when tuple is for a table name; col_id when the tuple is for a column name.
+
+  If formulas is given, it should be a set of (table_id, func_name) pairs; only the formula
+  functions it includes are inspected. The rest of the code is still parsed (so that types can be
+  inferred), but inference is only done for nodes within these functions.
   """
   code_text = builder.get_text()
 
@@ -560,7 +564,8 @@ def parse_grist_names(builder):
         yield make_tuple(start, end, table_id, col_id)
 
   parsed_names = []
-  for node in asttokens.util.walk(atok.tree, include_joined_str=True):
+  roots = [atok.tree] if formulas is None else _formula_functions(atok.tree, formulas)
+  for node in (n for root in roots for n in asttokens.util.walk(root, include_joined_str=True)):
     if isinstance(node, astroid.nodes.Name):
       obj = infer(node)
       if _is_table(obj) and not _is_local(node):
@@ -606,6 +611,19 @@ def parse_grist_names(builder):
   return [name for name in parsed_names if name]
 
 
+def _formula_functions(module_node, formulas):
+  """
+  Yields the FunctionDef nodes of table classes in module_node whose (table_id, func_name) is
+  included in the formulas set, in the order in which they appear in the code.
+  """
+  for table_node in module_node.body:
+    if not _is_table(table_node):
+      continue
+    for node in table_node.body:
+      if isinstance(node, astroid.nodes.FunctionDef) and (table_node.name, node.name) in formulas:
+        yield node
+
+
 code_filename = "usercode"
 
 def parse_order_group_by(atok, node):
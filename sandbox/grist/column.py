@@ -1,10 +1,12 @@
 import json
 import logging
+import operator
 import types
 from collections import namedtuple
 from numbers import Number
 
 import actions
+import column_storage
 import depend
 import objtypes
 import usertypes
@@ -61,7 +63,7 @@ class BaseColumn(object):
   def __init__(self, table, col_id, col_info):
     self.type_obj = col_info.type_obj
     self._is_right_type = self.type_obj.is_right_type
-    self._data = []
+    self._data = self._make_storage()
     self.col_id = col_id
     self.table_id = table.table_id
     self.node = depend.Node(self.table_id, col_id)
@@ -101,14 +103,22 @@ class BaseColumn(object):
     return self.method is not None
 
   def clear(self):
-    self._data = []
+    self._data = self._make_storage()
     self.growto(1)    # Always include the special empty record at index 0.
 
   def destroy(self):
     """
     Called when the column is deleted.
     """
-    del self._data[:]
+    self._data = self._make_storage()
+
+  def _make_storage(self):
+    """
+    Returns a new empty storage for the values of this column. It's a list by default; see
+    column_storage.py for other options.
+    """
+    # pylint: disable=no-self-use
+    return []
 
   def growto(self, size):
     if len(self._data) < size:
@@ -117,6 +127,25 @@ class BaseColumn(object):
   def size(self):
     return len(self._data)
 
+  def compact_storage(self):
+    """
+    Switches the storage of this column's values from a plain list to a more compact one (see
+    column_storage.py) if the values allow it, e.g. if they are mostly blank. It's called once a
+    table is loaded; the storage is transparent to the rest of the column's methods.
+    """
+    if type(self._data) is list:    # pylint: disable=unidiomatic-typecheck
+      self._data = column_storage.choose_storage(self._data, self.getdefault())
+
+  def check_storage(self):
+    """
+    Switches the storage of this column's values back to a plain list if it's sparse, but enough
+    values got filled in since then that it no longer saves memory. It's called after setting
+    values in bulk.
+    """
+    data = self._data
+    if isinstance(data, column_storage.SparseStorage) and data.is_dense():
+      self._data = list(data)
+
   def set(self, row_id, value):
     """
     Sets the value of this column for the given row_id. Value should be as returned by convert(),
@@ -134,6 +163,29 @@ class BaseColumn(object):
     """
     self.set(row_id, self.getdefault())
 
+  def unset_rows(self, row_ids):
+    """
+    Sets the values for all the given row_ids to the default value. It is equivalent to calling
+    unset() for each row, but avoids the per-row overhead of set(), which matters when removing
+    many records at once. Like growto(), it stores the default value as is.
+    """
+    default = self.getdefault()
+    data = self._data
+    size = len(data)
+    for row_id in row_ids:
+      if row_id < size:
+        data[row_id] = default
+
+  def has_default_values(self, values):
+    """
+    Returns whether all the given values are strictly equal to this column's default value.
+    """
+    default = self.getdefault()
+    default_type = type(default)
+    # This is strict_equal() inlined, since it's called for every cell of removed records. Values
+    # of the default's type (which is always a simple type) can be compared without errors.
+    return all(type(v) is default_type and v == default for v in values)
+
   def get_cell_value(self, row_id, restore=False):
     """
     Returns the "rich" value for the given row_id, i.e. the value that would be seen by formulas.
@@ -187,6 +239,19 @@ class BaseColumn(object):
     except IndexError:
       return self.getdefault()
 
+  def raw_get_many(self, row_ids):
+    """
+    Returns the list of values stored for the given row_ids, same as calling raw_get() for each.
+    It's considerably faster for many rows, e.g. when collecting undo values for bulk actions.
+    """
+    if not row_ids:
+      return []
+    try:
+      values = operator.itemgetter(*row_ids)(self._data)
+    except IndexError:
+      return [self.raw_get(r) for r in row_ids]
+    return list(values) if len(row_ids) > 1 else [values]
+
   def safe_get(self, row_id):
     """
     Returns a value of the right type, or the default value if the stored value had a wrong type.
@@ -212,7 +277,7 @@ class BaseColumn(object):
     """
     Replace this column's data entirely with data from another column of the same exact type.
     """
-    self._data[:] = other_column._data
+    self._data = other_column._data.copy()
 
   def convert(self, value_to_convert):
     """
@@ -238,6 +303,16 @@ class BaseColumn(object):
   def recalc_from_reverse_values(self):
     pass    # Only two-way references implement this
 
+  def get_plain_numbers(self, row_ids):
+    """
+    Returns the list of values for row_ids if this column's values are seen by formulas as is, and
+    all these values are numbers or None. Otherwise returns None, and values must be fetched with
+    get_cell_value(), which handles alttext and errors. This allows aggregating a RecordSet's
+    field without per-cell overhead.
+    """
+    # pylint: disable=no-self-use, unused-argument
+    return None
+
 
 class DataColumn(BaseColumn):
   """
@@ -247,16 +322,16 @@ class DataColumn(BaseColumn):
 
 
 class ChoiceColumn(DataColumn):
+  def _make_storage(self):
+    # Choice values repeat a lot, and dictionary encoding lets renames work per distinct value.
+    return column_storage.DictEncodedStorage()
+
   def rename_choices(self, renames):
-    row_ids = []
-    values = []
-    for row_id, value in enumerate(self._data):
+    def rename(value):
       if value is not None and self.type_obj.is_right_type(value):
-        value = self._rename_cell_choice(renames, value)
-        if value is not None:
-          row_ids.append(row_id)
-          values.append(value)
-    return row_ids, values
+        return self._rename_cell_choice(renames, value)
+      return None
+    return self._data.map_distinct(rename)
 
   def _rename_cell_choice(self, renames, value):
     # pylint: disable=no-self-use
@@ -280,6 +355,52 @@ class NumericColumn(BaseColumn):
     # pylint: disable=unidiomatic-typecheck
     super(NumericColumn, self).set(row_id, float(value) if type(value) == int else value)
 
+  def get_plain_numbers(self, row_ids):
+    values = self.raw_get_many(row_ids)
+    return values if _plain_number_types.issuperset(map(type, values)) else None
+
+# Types of values that NumericColumn formulas see as is (these are also Numeric's right types).
+_plain_number_types = frozenset((float, int, type(None)))
+
+# Rich-value caches are cleared when they reach this many entries, to bound their memory.
+MAX_RICH_VALUE_CACHE_SIZE = 10000
+
+class RichValueCache(object):
+  """
+  Per-column cache of rich values, for column types whose rich values are costly to construct on
+  every read (dates, datetimes, records). It is keyed by the typed value rather than by row, so
+  that it never needs invalidation on set(): rich values are immutable, and a given typed value
+  always produces an equivalent rich value. Hits and misses are counted for timing stats.
+  """
+  __slots__ = ('_values', '_make', 'hits', 'misses')
+
+  def __init__(self, make):
+    self._values = {}
+    self._make = make
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, typed_value):
+    try:
+      value = self._values[typed_value]
+    except KeyError:
+      self.misses += 1
+      if len(self._values) >= MAX_RICH_VALUE_CACHE_SIZE:
+        self._values.clear()
+      value = self._values[typed_value] = self._make(typed_value)
+      return value
+    self.hits += 1
+    return value
+
+  def pop_stats(self):
+    """
+    Returns the pair (hits, misses) counted since the last call, and resets the counts.
+    """
+    stats = (self.hits, self.misses)
+    self.hits = self.misses = 0
+    return stats
+
+
 _sample_date = moment.ts_to_date(0)
 _sample_datetime = moment.ts_to_dt(0, None, moment.TZ_UTC)
 
@@ -288,12 +409,19 @@ class DateColumn(NumericColumn):
   DateColumn contains numerical timestamps represented as seconds since epoch, in type float,
   to midnight of specific UTC dates. Accessing them yields date objects.
   """
+  def __init__(self, table, col_id, col_info):
+    super(DateColumn, self).__init__(table, col_id, col_info)
+    self.rich_value_cache = RichValueCache(moment.ts_to_date)
+
   def _make_rich_value(self, typed_value):
-    return moment.ts_to_date(typed_value) if isinstance(typed_value, float) else typed_value
+    return self.rich_value_cache.get(typed_value) if isinstance(typed_value, float) else typed_value
 
   def sample_value(self):
     return _sample_date
 
+  def get_plain_numbers(self, row_ids):
+    return None   # Formulas see date objects, not numbers.
+
 class DateTimeColumn(NumericColumn):
   """
   DateTimeColumn contains numerical timestamps represented as seconds since epoch, in type float,
@@ -302,14 +430,20 @@ class DateTimeColumn(NumericColumn):
   def __init__(self, table, col_id, col_info):
     super(DateTimeColumn, self).__init__(table, col_id, col_info)
     self._timezone = col_info.type_obj.timezone
+    self.rich_value_cache = RichValueCache(self._ts_to_dt)
+
+  def _ts_to_dt(self, typed_value):
+    return moment.ts_to_dt(typed_value, self._timezone)
 
   def _make_rich_value(self, typed_value):
-    return (moment.ts_to_dt(typed_value, self._timezone)
-        if isinstance(typed_value, float) else typed_value)
+    return self.rich_value_cache.get(typed_value) if isinstance(typed_value, float) else typed_value
 
   def sample_value(self):
     return _sample_datetime
 
+  def get_plain_numbers(self, row_ids):
+    return None   # Formulas see date objects, not numbers.
+
 
 class SafeSortKey(object):
   """
@@ -367,6 +501,12 @@ class PositionColumn(NumericColumn):
     if value != self.getdefault():
       self._sorted_rows.add(row_id)
 
+  def unset_rows(self, row_ids):
+    # Rows with default values are not included into _sorted_rows.
+    for row_id in row_ids:
+      self._sorted_rows.discard(row_id)
+    super(PositionColumn, self).unset_rows(row_ids)
+
   def copy_from_column(self, other_column):
     super(PositionColumn, self).copy_from_column(other_column)
     self._sorted_rows = SortedListWithKey(other_column._sorted_rows[:],
@@ -378,16 +518,40 @@ class PositionColumn(NumericColumn):
     # used for updating a position for an existing row: we'll find a new value for it; later when
     # this value is set, the old position will be removed and the new one added.
     if ignore_data:
-      rows = []
+      rows = SortedListWithKey(key=self.raw_get)
     else:
-      rows = self._sorted_rows
-    # prepare_inserts expects floats as keys, not MixedTypesKeys
-    rows = SortedListWithKey(rows, key=self.raw_get)
+      # prepare_inserts expects floats as keys, not MixedTypesKeys. Rather than copy and re-sort
+      # all rows, present the maintained index as if keyed by floats.
+      rows = _FloatKeyedRows(self._sorted_rows, self.raw_get)
     adjustments, new_values = relabeling.prepare_inserts(rows, values)
     adj_action = _adjustments_to_action(self.node,
         [(self._sorted_rows[i], pos) for (i, pos) in adjustments])
     return new_values, ([adj_action] if adj_action else [])
 
+  def get_plain_numbers(self, row_ids):
+    return None   # Positions don't allow None, so their right types differ from Numeric's.
+
+
+class _FloatKeyedRows(object):
+  """
+  Read-only view of PositionColumn._sorted_rows (keyed by SafeSortKey) that offers the subset of
+  the SortedListWithKey interface used by relabeling.prepare_inserts(), keyed by raw positions.
+  """
+  __slots__ = ("_rows", "_key")
+
+  def __init__(self, sorted_rows, get_position):
+    self._rows = sorted_rows
+    self._key = get_position
+
+  def __len__(self):
+    return len(self._rows)
+
+  def __getitem__(self, index):
+    return self._rows[index]
+
+  def bisect_key_left(self, key):
+    return self._rows.bisect_key_left(SafeSortKey(key))
+
 
 class ChoiceListColumn(ChoiceColumn):
   """
@@ -425,6 +589,13 @@ class BaseReferenceColumn(BaseColumn):
     self._table = table
     self._target_table = table._engine.tables.get(target_table_id, None)
     self._relation = relation.ReferenceRelation(table.table_id, target_table_id, col_id)
+    # Maps row_id to (new_value, deltas) for values of this column produced by
+    # _adjust_reverse_values(). When deltas is a pair (removals, additions), setting the value
+    # only needs to apply those changes.
+    self._pending_reverse_deltas = {}
+    # Rows whose values were last set by _adjust_reverse_values(), and so matched the references
+    # from the column of which this one is the reverse.
+    self._reverse_rows_in_sync = set()
     # Note that we need to remove these back-references when the column is removed.
     if self._target_table:
       self._target_table._back_references.add(self)
@@ -444,9 +615,16 @@ class BaseReferenceColumn(BaseColumn):
       self._target_table._back_references.remove(self)
 
   def _update_references(self, row_id, old_value, new_value):
-    for r in self._value_iterable(old_value):
+    old_refs = self._value_iterable(old_value)
+    new_refs = self._value_iterable(new_value)
+    if old_refs and new_refs:
+      # Only touch references that changed, since lists may be long (e.g. in the reverse column
+      # of a two-way reference) while the change is small.
+      old_set, new_set = set(old_refs), set(new_refs)
+      old_refs, new_refs = old_set - new_set, new_set - old_set
+    for r in old_refs:
       self._relation.remove_reference(row_id, r)
-    for r in self._value_iterable(new_value):
+    for r in new_refs:
       self._relation.add_reference(row_id, r)
 
   def _reject_unresolved_temp_ids(self, values):
@@ -469,14 +647,36 @@ class BaseReferenceColumn(BaseColumn):
     raise NotImplementedError()
 
   def set(self, row_id, value):
-    old = self.safe_get(row_id)
+    # No need for safe_get(): _update_references() ignores values of the wrong type anyway.
+    old = self.raw_get(row_id)
     super(BaseReferenceColumn, self).set(row_id, self._clean_up_value(value))
-    new = self.safe_get(row_id)
+    new = self.raw_get(row_id)
+    pending = self._pending_reverse_deltas.pop(row_id, None)
+    if pending and pending[0] is new:
+      self._reverse_rows_in_sync.add(row_id)
+      if pending[1]:
+        removals, additions = pending[1]
+        for r in removals:
+          self._relation.remove_reference(row_id, r)
+        for r in additions:
+          self._relation.add_reference(row_id, r)
+        return
+    else:
+      self._reverse_rows_in_sync.discard(row_id)
     self._update_references(row_id, old, new)
 
+  def unset_rows(self, row_ids):
+    # Default values don't refer to anything, so we only need to remove the current references.
+    self._reverse_rows_in_sync.difference_update(row_ids)
+    for row_id in row_ids:
+      for r in self._value_iterable(self.safe_get(row_id)):
+        self._relation.remove_reference(row_id, r)
+    super(BaseReferenceColumn, self).unset_rows(row_ids)
+
   def copy_from_column(self, other_column):
     super(BaseReferenceColumn, self).copy_from_column(other_column)
     self._relation.clear()
+    self._reverse_rows_in_sync.clear()
     # This is hacky: we should have an interface to iterate through values of a column. (As it is,
     # self._data may include values for non-existent rows; it works here because those values are
     # falsy, which makes them ignored by self._update_references).
@@ -502,17 +702,38 @@ class BaseReferenceColumn(BaseColumn):
     if reverse_cols:
       old_values = [self.raw_get(r) for r in row_ids]
       reverse_adjustments = reverse_references.get_reverse_adjustments(
-          row_ids, old_values, values, self._value_iterable, self._relation)
+          row_ids, old_values, values, self._value_iterable)
 
       if reverse_adjustments:
         for reverse_col in reverse_cols:
-          adjustments.append(_adjustments_to_action(
-            reverse_col.node,
-            [(row_id, reverse_col._list_to_value(value)) for (row_id, value) in reverse_adjustments]
-          ))
+          adjustments.append(reverse_col._adjust_reverse_values(reverse_adjustments,
+                                                                self._relation))
 
     return values, adjustments
 
+  def _adjust_reverse_values(self, reverse_adjustments, source_relation):
+    """
+    Returns a BulkUpdateRecord action to update values of this column, given the changes to them
+    as returned by get_reverse_adjustments() for the column with the given relation, of which
+    this one is the reverse.
+    """
+    row_value_pairs = []
+    pending = {}
+    for (row_id, removals, additions) in reverse_adjustments:
+      # If the current value is known to list the same rows as the relation, it's cheaper to
+      # copy it than to build the list from the relation, and the changes are all that differ.
+      # Otherwise, the value is rebuilt, which also corrects it if it was out of sync.
+      current = self.raw_get(row_id)
+      in_sync = (row_id in self._reverse_rows_in_sync and type(current) is list and
+                 len(current) == source_relation.get_referring_count(row_id))
+      value = list(current) if in_sync else source_relation.get_referring_rows(row_id)
+      reverse_references.apply_deltas(value, removals, additions)
+      value = self._list_to_value(value)
+      pending[row_id] = (value, (removals, additions) if in_sync else None)
+      row_value_pairs.append((row_id, value))
+    self._pending_reverse_deltas = pending
+    return _adjustments_to_action(self.node, row_value_pairs)
+
   def recalc_from_reverse_values(self):
     """
     Generates actions to update reverse column based on this column.
@@ -523,8 +744,7 @@ class BaseReferenceColumn(BaseColumn):
     reverse_col = self._target_table.get_column(rev_col_id)
     reverse_adjustments = []
     for target_row_id in self._target_table.row_ids:
-      reverse_value = self._relation.get_affected_rows((target_row_id,))
-      reverse_adjustments.append((target_row_id, sorted(reverse_value)))
+      reverse_adjustments.append((target_row_id, self._relation.get_referring_rows(target_row_id)))
     return _adjustments_to_action(reverse_col.node,
         [(row_id, reverse_col._list_to_value(value)) for (row_id, value) in reverse_adjustments])
 
@@ -553,13 +773,20 @@ class ReferenceColumn(BaseReferenceColumn):
   ReferenceColumn contains IDs of rows in another table. Accessing them yields the records in the
   other table.
   """
+  def __init__(self, table, col_id, col_info):
+    super(ReferenceColumn, self).__init__(table, col_id, col_info)
+    self.rich_value_cache = RichValueCache(self._make_record)
+
+  def _make_record(self, typed_value):
+    # For a Reference, values must either refer to an existing record, or be 0. In all tables,
+    # the 0 index will contain the all-defaults record.
+    return self._target_table.Record(typed_value, self._relation)
+
   def _make_rich_value(self, typed_value):
     # If we refer to an invalid table, return integers rather than fail completely.
     if not self._target_table:
       return typed_value
-    # For a Reference, values must either refer to an existing record, or be 0. In all tables,
-    # the 0 index will contain the all-defaults record.
-    return self._target_table.Record(typed_value, self._relation)
+    return self.rich_value_cache.get(typed_value)
 
   def _value_iterable(self, value):
     return (value,) if value and self.type_obj.is_right_type(value) else ()
@@ -0,0 +1,268 @@
+"""
+Compact alternatives to a plain list for holding a column's values, for the common cases of
+columns that are mostly blank, or that repeat a few distinct values (like Choice or status fields).
+A list takes a pointer per row, and every loaded cell is a separate object, even when it's the
+same string as in thousands of other rows.
+
+  SparseStorage keeps only the values that differ from the column's default.
+  DictEncodedStorage keeps each distinct value once, and a compact array of codes per row.
+
+Both support the subset of the list interface that BaseColumn relies on: len(), indexing (raising
+IndexError past the end), item assignment, iteration, extend() with a list, and copy(). Which
+storage to use is decided by choose_storage(), once a table's data is loaded.
+"""
+from array import array
+import itertools
+
+# Tables with fewer rows keep plain lists: the savings would be negligible.
+MIN_ROWS = 1024
+
+# Sparse storage costs about as much per non-default value as a list does for 12 rows, so it's
+# chosen when at most one in this many values differ from the default.
+SPARSE_RATIO = 16
+
+# Sparse storage takes more memory than a list once more than about one in 12 values differ from
+# the default. Once more than one in this many values do, it's switched back to a list.
+DENSE_RATIO = 8
+
+# Dictionary encoding is chosen when each distinct value is repeated this many times on average.
+ENCODED_RATIO = 8
+
+# Types of values that are dictionary-encoded. They are hashable, and values of the same type are
+# equal only when they are interchangeable. Floats are excluded (0.0 == -0.0, and NaN != NaN), as
+# are types that are themselves containers of arbitrary values (except tuples of strings, used by
+# ChoiceList). Other values are kept on the side, by row_id.
+_ENCODABLE_TYPES = frozenset((str, bool, int, type(None)))
+
+# Array typecodes for codes, from the most compact, with the largest code each can hold.
+_CODE_TYPES = (('B', 0xFF), ('H', 0xFFFF), ('l', None))
+
+
+def choose_storage(values, default):
+  """
+  Returns the storage to use for a column with the given list of values: either the list itself,
+  or a more compact storage with the same values when it would take substantially less memory.
+  """
+  size = len(values)
+  if size < MIN_ROWS:
+    return values
+
+  # These are estimates, so values equal to the default (like 0 and False) count as default here.
+  if (size - values.count(default)) * SPARSE_RATIO <= size:
+    return SparseStorage(default, values)
+
+  # Values that can't be encoded (like floats) are kept on the side at a higher cost than in a
+  # list, so only columns where they are rare are worth encoding.
+  keys = [_encoding_key(v) for v in values]
+  if keys.count(None) * ENCODED_RATIO > size:
+    return values
+  if len(set(keys)) * ENCODED_RATIO <= size:
+    return DictEncodedStorage(values)
+  return values
+
+
+def _is_same_as_default(value, default):
+  # Whether value can be replaced by default without any change: of the same type, equal, and for
+  # floats, with the same sign (since 0.0 == -0.0).
+  return (type(value) is type(default) and value == default and
+          (type(value) is not float or str(value) == str(default)))
+
+
+class SparseStorage(object):
+  """
+  Storage of a column's values as a dict of the values that differ from the default.
+  """
+  __slots__ = ('_default', '_values', '_size')
+
+  def __init__(self, default, values=()):
+    self._default = default
+    self._values = {}
+    self._size = 0
+    self.extend(values)
+
+  def __len__(self):
+    return self._size
+
+  def is_dense(self):
+    """
+    Returns whether enough values differ from the default that a plain list would be smaller.
+    """
+    return len(self._values) * DENSE_RATIO > self._size
+
+  def __getitem__(self, row_id):
+    if not 0 <= row_id < self._size:
+      raise IndexError("storage index out of range")
+    return self._values.get(row_id, self._default)
+
+  def __setitem__(self, row_id, value):
+    if not 0 <= row_id < self._size:
+      raise IndexError("storage assignment index out of range")
+    if _is_same_as_default(value, self._default):
+      self._values.pop(row_id, None)
+    else:
+      self._values[row_id] = value
+
+  def __iter__(self):
+    get, default = self._values.get, self._default
+    return (get(row_id, default) for row_id in range(self._size))
+
+  def extend(self, values):
+    default = self._default
+    stored = self._values
+    for row_id, value in enumerate(values, self._size):
+      if value is not default and not _is_same_as_default(value, default):
+        stored[row_id] = value
+    self._size += len(values)
+
+  def copy(self):
+    storage = SparseStorage(self._default)
+    storage._values = self._values.copy()
+    storage._size = self._size
+    return storage
+
+
+def _encoding_key(value):
+  """
+  Returns the key under which value is dictionary-encoded, or None if it's not encodable.
+  """
+  value_type = type(value)
+  if value_type in _ENCODABLE_TYPES or (
+      value_type is tuple and all(type(v) is str for v in value)):
+    # The type is part of the key so that e.g. 1 and True get separate codes.
+    return (value_type, value)
+  return None
+
+
+class DictEncodedStorage(object):
+  """
+  Storage of a column's values as a list of distinct values, and an array with the code (index
+  into that list) of the value in each row. Code 0 is reserved for values that can't be encoded,
+  which are kept in a dict by row_id. Codes of values no longer used by any row get reused.
+  """
+  __slots__ = ('_values', '_counts', '_codes', '_free_codes', '_index', '_max_code', '_other')
+
+  def __init__(self, values=()):
+    self._values = [None]       # Maps code to value.
+    self._counts = [0]          # Maps code to the number of rows using it.
+    self._codes = {}            # Maps encoding key to code.
+    self._free_codes = []
+    self._index = array(_CODE_TYPES[0][0])
+    self._max_code = _CODE_TYPES[0][1]
+    self._other = {}            # Maps row_id to value, for values with code 0.
+    self.extend(values)
+
+  def __len__(self):
+    return len(self._index)
+
+  def __getitem__(self, row_id):
+    code = self._index[row_id]
+    return self._values[code] if code else self._other[row_id]
+
+  def __setitem__(self, row_id, value):
+    old_code = self._index[row_id]
+    code = self._encode(value)
+    self._release(old_code, row_id)
+    self._index[row_id] = code
+    if not code:
+      self._other[row_id] = value
+
+  def __iter__(self):
+    values, other = self._values, self._other
+    for row_id, code in enumerate(self._index):
+      yield values[code] if code else other[row_id]
+
+  def extend(self, values):
+    codes, counts = self._codes, self._counts
+    for value in values:
+      # Repeated values of common types are the bulk of calls, so handle them without _encode().
+      value_type = type(value)
+      code = codes.get((value_type, value)) if value_type in _ENCODABLE_TYPES else None
+      if code is not None:
+        counts[code] += 1
+      else:
+        code = self._encode(value)
+        if not code:
+          self._other[len(self._index)] = value
+      self._index.append(code)
+
+  def copy(self):
+    storage = DictEncodedStorage()
+    storage._values = self._values[:]
+    storage._counts = self._counts[:]
+    storage._codes = self._codes.copy()
+    storage._free_codes = self._free_codes[:]
+    storage._index = self._index[:]
+    storage._max_code = self._max_code
+    storage._other = self._other.copy()
+    return storage
+
+  def map_distinct(self, func):
+    """
+    Returns a pair (row_ids, new_values) for the rows whose value is mapped by func to something
+    other than None. Calls func once for each distinct value (and for each unencoded value), so
+    it's cheap to e.g. rename values that are repeated in many rows.
+    """
+    new_values_by_code = {}
+    for code, value in enumerate(self._values):
+      if code and self._counts[code]:
+        new_value = func(value)
+        if new_value is not None:
+          new_values_by_code[code] = new_value
+
+    row_ids = []
+    new_values = []
+    if new_values_by_code:
+      for row_id, code in enumerate(self._index):
+        if code in new_values_by_code:
+          row_ids.append(row_id)
+          new_values.append(new_values_by_code[code])
+
+    other_changes = [(row_id, func(value)) for (row_id, value) in self._other.items()]
+    other_changes = [(row_id, new_value) for (row_id, new_value) in other_changes
+                     if new_value is not None]
+    if other_changes:
+      changes = sorted(itertools.chain(zip(row_ids, new_values), other_changes))
+      row_ids = [row_id for (row_id, _) in changes]
+      new_values = [new_value for (_, new_value) in changes]
+    return row_ids, new_values
+
+  def _encode(self, value):
+    """
+    Returns the code for value, adding it to the list of distinct values if needed, and counting
+    the new use of it. Returns 0 for values that aren't encodable.
+    """
+    key = _encoding_key(value)
+    if key is None:
+      return 0
+    code = self._codes.get(key)
+    if code is None:
+      if self._free_codes:
+        code = self._free_codes.pop()
+        self._values[code] = value
+      else:
+        code = len(self._values)
+        self._values.append(value)
+        self._counts.append(0)
+        if self._max_code is not None and code > self._max_code:
+          self._widen_index()
+      self._codes[key] = code
+    self._counts[code] += 1
+    return code
+
+  def _release(self, code, row_id):
+    """
+    Forgets the use of code by row_id, and frees the code if it's no longer used.
+    """
+    if not code:
+      self._other.pop(row_id, None)
+      return
+    self._counts[code] -= 1
+    if not self._counts[code]:
+      del self._codes[_encoding_key(self._values[code])]
+      self._values[code] = None
+      self._free_codes.append(code)
+
+  def _widen_index(self):
+    typecodes = [t for (t, _) in _CODE_TYPES]
+    typecode, self._max_code = _CODE_TYPES[typecodes.index(self._index.typecode) + 1]
+    self._index = array(typecode, self._index)
@@ -0,0 +1,85 @@
+"""
+Counters of the data engine's work, cheap enough to be always on (unlike the per-formula timing of
+timing.py). They let operators correlate slow documents with specific engine behavior, and are
+retrieved (and reset) with the get_engine_counters() sandbox method.
+"""
+from collections import defaultdict
+import contextlib
+import gc
+import time
+
+# The number of the most recomputed columns to include in the results of get().
+TOP_NODES = 10
+
+
+class Counters(object):
+  def __init__(self):
+    # Maps counter names to numbers (counts, or durations in seconds).
+    self._counts = defaultdict(int)
+    # Maps nodes to the number of cells recomputed.
+    self._node_cells = defaultdict(int)
+    self._gc_start = None
+
+  def add(self, name, count=1):
+    self._counts[name] += count
+
+  def add_cells(self, node, count):
+    self._node_cells[node] += count
+
+  @contextlib.contextmanager
+  def measure(self, name):
+    """
+    Counts the calls of a block of code as `<name>_count`, and the time spent in it as
+    `<name>_seconds`.
+    """
+    start = time.time()
+    try:
+      yield
+    finally:
+      self._counts[name + "_count"] += 1
+      self._counts[name + "_seconds"] += time.time() - start
+
+  def track_gc(self):
+    """
+    Starts counting garbage collections, and the pauses they cause. Since the garbage collector is
+    global to the process, this should be called for a single Counters object.
+    """
+    gc.callbacks.append(self._on_gc)
+
+  def untrack_gc(self):
+    gc.callbacks.remove(self._on_gc)
+
+  def _on_gc(self, phase, _info):
+    if phase == "start":
+      self._gc_start = time.time()
+    elif self._gc_start is not None:
+      self._counts["gc_collections"] += 1
+      self._counts["gc_pause_seconds"] += time.time() - self._gc_start
+      self._gc_start = None
+
+  def get(self, clear=True):
+    """
+    Returns a dict with the counters, including the total number of cells recomputed, and the
+    columns with the most cells recomputed. Lookup maps are counted separately from other columns.
+    """
+    result = dict(self._counts)
+    lookup_cells = 0
+    cells = []
+    for node, count in self._node_cells.items():
+      if node.col_id.startswith("#lookup"):
+        lookup_cells += count
+      else:
+        cells.append((count, node))
+    cells.sort(key=lambda item: -item[0])
+    result["cells_recomputed"] = sum(count for (count, _) in cells)
+    result["lookup_map_updates"] = lookup_cells
+    result["top_recomputed_columns"] = [
+      {"tableId": node.table_id, "colId": node.col_id, "count": count}
+      for (count, node) in cells[:TOP_NODES]]
+    if clear:
+      self.clear()
+    return result
+
+  def clear(self):
+    self._counts.clear()
+    self._node_cells.clear()
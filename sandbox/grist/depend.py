@@ -19,7 +19,7 @@ in use, while property access determines which Nodes (or columns) depend on one
 # that recompute manually rather than automatically.
 
 from collections import namedtuple
-from sortedcontainers import SortedSet
+from row_id_set import RowIdSet
 
 class Node(namedtuple('Node', ('table_id', 'col_id'))):
   """
@@ -59,11 +59,53 @@ class _AllRows(object):
 
 ALL_ROWS = _AllRows()
 
+class RecomputeMap(dict):
+  """
+  Maps Nodes to sets of dirty rows (that need to be recomputed). It also keeps track of which of
+  its nodes are lookup nodes of metadata tables, to allow bringing those up to date after each doc
+  action without scanning all dirty nodes.
+  """
+  __slots__ = ('mlookup_nodes',)
+
+  def __init__(self):
+    super(RecomputeMap, self).__init__()
+    self.mlookup_nodes = set()
+
+  def __setitem__(self, node, rows):
+    if _is_mlookup_node(node):
+      self.mlookup_nodes.add(node)
+    dict.__setitem__(self, node, rows)
+
+  def setdefault(self, node, default=None):
+    if _is_mlookup_node(node):
+      self.mlookup_nodes.add(node)
+    return dict.setdefault(self, node, default)
+
+  def pop(self, node, *default):
+    self.mlookup_nodes.discard(node)
+    return dict.pop(self, node, *default)
+
+  def __delitem__(self, node):
+    self.mlookup_nodes.discard(node)
+    dict.__delitem__(self, node)
+
+  def clear(self):
+    self.mlookup_nodes.clear()
+    dict.clear(self)
+
+
+def _is_mlookup_node(node):
+  return node.col_id.startswith('#lookup') and node.table_id.startswith('_grist_')
+
+
 class Graph(object):
   """
   Represents the dependency graph for all data in a grist document.
   """
-  def __init__(self):
+  def __init__(self, counters=None):
+    # Optional counters.Counters, to count the nodes invalidated.
+    self._counters = counters
+
     # The set of all Edges, i.e. the complete dependency graph.
     self._all_edges = set()
 
@@ -101,6 +143,12 @@ class Graph(object):
       self._in_node_map.get(edge.in_node, set()).remove(edge)
       edge.relation.reset_all()
 
+  def get_dependencies(self, out_node):
+    """
+    Returns the edges for the dependencies of the given out_node.
+    """
+    return self._out_node_map.get(out_node, ())
+
   def reset_dependencies(self, node, dirty_rows):
     """
     For edges the given node depends on, reset the given output rows. This is called just before
@@ -132,9 +180,11 @@ class Graph(object):
     scratch. ALL_ROWS propagates to all dependent columns, so those also get recomputed in full.
     """
     to_invalidate = [(dirty_node, dirty_rows)]
+    num_invalidated = 0
 
     while to_invalidate:
       dirty_node, dirty_rows = to_invalidate.pop()
+      num_invalidated += 1
       if include_self:
         if recompute_map.get(dirty_node) == ALL_ROWS:
           continue
@@ -145,7 +195,7 @@ class Graph(object):
           # dependencies if we are about to recompute all rows.)
           self.clear_dependencies(dirty_node)
         else:
-          out_rows = recompute_map.setdefault(dirty_node, SortedSet())
+          out_rows = recompute_map.setdefault(dirty_node, RowIdSet())
           prev_count = len(out_rows)
           out_rows.update(dirty_rows)
           # Don't bother recursing into dependencies if we didn't actually update anything.
@@ -162,3 +212,6 @@ class Graph(object):
         # but that led to a recursion error, so now we do the equivalent
         # without actual recursion, hence the while loop
         to_invalidate.append((edge.out_node, affected_rows))
+
+    if self._counters is not None:
+      self._counters.add("invalidated_nodes", num_invalidated)
@@ -45,13 +45,11 @@ class DocActions(object):
     undo_values = {}
     for column in table.all_columns.values():
       if not column.is_private() and column.col_id != "id":
-        col_values = [column.raw_get(r) for r in row_ids]
-        default = column.getdefault()
+        col_values = column.raw_get_many(row_ids)
         # If this column had all default values, don't include it into the undo BulkAddRecord.
-        if not all(strict_equal(val, default) for val in col_values):
+        if not column.has_default_values(col_values):
           undo_values[column.col_id] = col_values
-      for row_id in row_ids:
-        column.unset(row_id)
+      column.unset_rows(row_ids)
 
     # Generate the undo action.
     self._engine.out_actions.undo.append(
@@ -75,9 +73,10 @@ class DocActions(object):
     undo_values = {}
     for col_id, values in columns.items():
       col = table.get_column(col_id)
-      undo_values[col_id] = [col.raw_get(r) for r in row_ids]
+      undo_values[col_id] = col.raw_get_many(row_ids)
       for (row_id, value) in zip(row_ids, values):
         col.set(row_id, value)
+      col.check_storage()
 
       # Non-formula columns may get invalidated and recalculated if they have a trigger formula.
       # Prevent such recalculation if we set an explicit value for them (we want to prevent it
@@ -96,7 +95,9 @@ class DocActions(object):
     # If the column update changes its trigger-formula conditions, rebuild dependencies.
     if (table_id == "_grist_Tables_column" and
        ("recalcWhen" in columns or "recalcDeps" in columns)):
-      self._engine.trigger_columns_changed()
+      col_table = self._engine.docmodel.columns.table
+      self._engine.trigger_columns_changed(
+        {col_table.get_record(row_id).parentId.tableId for row_id in row_ids})
 
   def ReplaceTableData(self, table_id, row_ids, column_values):
     old_data = self._engine.fetch_table(table_id, formulas=False)
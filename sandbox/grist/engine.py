@@ -3,8 +3,11 @@
 The data engine ties the code generated from the schema with the document data, and with
 dependency tracking.
 """
+import datetime
+import functools
 import itertools
 import logging
+import os
 import re
 import rlcompleter
 import sys
@@ -13,11 +16,11 @@ import traceback
 from collections import namedtuple, OrderedDict, defaultdict
 
 from collections.abc import Hashable
-from sortedcontainers import SortedSet
 
 import acl
 import actions
 import action_obj
+import counters
 from attribute_recorder import AttributeRecorder
 from autocomplete_context import AutocompleteContext, lookup_autocomplete_options, eval_suggestion
 from codebuilder import DOLLAR_REGEX
@@ -29,7 +32,8 @@ import gencode
 import match_counter
 import objtypes
 from objtypes import strict_equal
-from relation import SingleRowsIdentityRelation
+from relation import IdentityRelation, SingleRowsIdentityRelation
+from row_id_set import RowIdSet
 import sandbox
 import schema
 from schema import RecalcWhen
@@ -37,11 +41,31 @@ import table as table_module
 from timing import DummyTiming
 from user import User # pylint:disable=wrong-import-order
 import useractions
+import workers
 import column
 import urllib_patch  # noqa imported for side effect # pylint:disable=unused-import
 
 log = logging.getLogger(__name__)
 
+# How long, in seconds, a REQUEST() response is reused by default before being requested again.
+REQUEST_TTL = 3600
+
+# How long to wait for a response to a delegated request before making the request again.
+REQUEST_TIMEOUT = 300
+
+# The total size, in bytes, of REQUEST() responses to keep in memory for reuse. Beyond that, the
+# least recently used ones get dropped, and are requested again when needed.
+REQUEST_CACHE_BYTES = 8 * 1024 * 1024
+
+# The number of dirty rows of a formula column for which it's worth evaluating the formula in
+# several processes, when enabled (see _evaluate_in_workers).
+WORKERS_MIN_ROWS = 5000
+
+# Types of formula results that get passed back from worker processes. Others (e.g. records, or
+# lists) get evaluated again in the main process.
+_WORKER_RESULT_TYPES = frozenset((str, int, float, bool, type(None), datetime.date,
+                                  datetime.datetime, datetime.time))
+
 
 class OrderError(Exception):
   """
@@ -152,11 +176,14 @@ class Engine(object):
     # The module containing the compiled user code generated from the schema.
     self.gencode = gencode.GenCode()
 
+    # Always-on counters of the engine's work, for diagnosing slow documents.
+    self.counters = counters.Counters()
+
     # Maintain the dependency graph of what Nodes (columns) depend on what other Nodes.
-    self.dep_graph = depend.Graph()
+    self.dep_graph = depend.Graph(self.counters)
 
     # Maps Nodes to sets of dirty rows (that need to be recomputed).
-    self.recompute_map = {}
+    self.recompute_map = depend.RecomputeMap()
 
     # Maps Nodes to sets of done rows (to avoid recomputing in an infinite loop).
     self._recompute_done_map = {}
@@ -219,11 +246,27 @@ class Engine(object):
     # data columns manually changed in this UserAction.
     self._prevent_recompute_map = {}
 
-    # Whether any trigger columns may need to have their dependencies rebuilt.
+    # Whether trigger columns in all tables may need to have their dependencies rebuilt.
     self._have_trigger_columns_changed = True
+    # The set of tables whose trigger columns may need to have their dependencies rebuilt.
+    self._trigger_tables_changed = set()
+
+    # The set of tables whose schema a useraction changes, to verify consistency afterwards.
+    self._schema_updated_tables = set()
+
+    # Maps each node for a coarse period of time (see use_current_time()) to a pair of the
+    # function that computes the current period, and the period seen by formulas.
+    self._time_periods = {}
 
-    # A flag for when a useraction causes a schema change, to verify consistency afterwards.
-    self._schema_updated = False
+    # Whether to verify consistency of the whole schema rather than only of the changed tables.
+    # It's slow for documents with many tables, but can help catch bugs.
+    self.full_schema_check = bool(os.environ.get('GRIST_FULL_SCHEMA_CHECK'))
+
+    # The number of processes among which to split the evaluation of a formula for many rows (the
+    # initial calculation after an import being the main use). It relies on os.fork(), and is off
+    # by default, since formulas with side effects other than on the document's data can't be
+    # told apart, and their side effects would be lost.
+    self.formula_workers = int(os.environ.get('GRIST_FORMULA_WORKERS') or 0)
 
     # Set to false temporarily to suppress rebuild_usercode for performance.
     # Used when importing which can add many columns which calls rebuild_usercode each time.
@@ -257,6 +300,15 @@ class Engine(object):
     # be fetched synchronously via the exported JS method. This allows a single formula to
     # make multiple different requests without needing to keep all the responses in memory.
     self._cached_request_keys = set()
+    # OrderedDict of string keys to triples (response, time received, size), with the least
+    # recently used first, so that formulas don't need to make the same request again until it
+    # expires. Only successful responses are kept, up to REQUEST_CACHE_BYTES in total.
+    self._request_cache = OrderedDict()
+    self._request_cache_bytes = 0
+    # dict of string keys of requests delegated to JS and not yet responded to, to a pair of the
+    # time of the request, and a dict {table_id: {col_id: set(row_ids)}} of the cells which asked
+    # for it, and should get reevaluated with the response.
+    self._requests_in_flight = {}
 
     self._timing = DummyTiming()
 
@@ -279,6 +331,19 @@ class Engine(object):
     result["cells"] = result["rows"] * result["columns"]
     self._table_stats[category].append(result)
 
+  def record_rich_value_cache_stats(self):
+    """
+    Moves the hit and miss counts of columns' rich-value caches (see column.RichValueCache) into
+    the timing stats, resetting them.
+    """
+    for table in self.tables.values():
+      for col in table.all_columns.values():
+        cache = getattr(col, 'rich_value_cache', None)
+        if cache is not None:
+          hits, misses = cache.pop_stats()
+          if hits or misses:
+            self._timing.record_cache_stats(col.node, hits, misses)
+
   def get_table_stats(self):
     result = defaultdict(int, num_user_tables=len(self._table_stats["user"]))
 
@@ -340,6 +405,12 @@ class Engine(object):
     # Add the records.
     self.add_records(data.table_id, data.row_ids, columns)
 
+    # Now that the values are known, switch to compact storage for columns where it pays off. The
+    # id column is consulted on every check of whether a row exists, so it stays a plain list.
+    for column in table.all_columns.values():
+      if column is not table._id_column:
+        column.compact_storage()
+
   def load_done(self):
     """
     Finalizes the loading of data into this Engine.
@@ -372,6 +443,7 @@ class Engine(object):
       column.growto(growto_size)
       for row_id, value in zip(row_ids, values):
         column.set(row_id, value)
+      column.check_storage()
 
     # Invalidate new records to cause the formula columns to get recomputed.
     self.invalidate_records(table_id, row_ids)
@@ -412,7 +484,7 @@ class Engine(object):
       if ((formulas or not c.is_formula())
           and (private or not c.is_private())
           and c.col_id != "id" and not column.is_virtual_column(c.col_id)):
-        column_values[c.col_id] = [c.raw_get(r) for r in row_ids]
+        column_values[c.col_id] = c.raw_get_many(row_ids)
 
     return actions.TableData(table_id, row_ids, column_values)
 
@@ -470,18 +542,45 @@ class Engine(object):
     log.info('Found column from values in %.3fs', time.time() - start_time)
     return [c[1] for c in matched_cols]
 
-  def assert_schema_consistent(self):
+  def _build_table_schema(self, table_id):
+    """
+    Returns the SchemaTable for the given table as represented by the metadata, like
+    schema.build_schema() does for all tables, or None if there is no such table in metadata.
+    """
+    table_rec = self.docmodel.tables.lookupOne(tableId=table_id)
+    if not table_rec:
+      return None
+    columns = OrderedDict(
+      (c.colId, schema.SchemaColumn(c.colId, c.type, bool(c.isFormula), c.formula,
+                                    c.reverseCol.colId or None))
+      for c in self.docmodel.columns.lookupRecords(parentId=table_rec.id, sort_by='parentPos'))
+    return schema.SchemaTable(table_rec.tableId, columns)
+
+  def assert_schema_consistent(self, table_ids=None):
     """
     Asserts that the internally-stored schema is equivalent to the schema as represented by the
-    special tables of metadata.
-    """
-    meta_tables = self.fetch_table('_grist_Tables')
-    meta_columns = self.fetch_table('_grist_Tables_column')
-    gen_schema = schema.build_schema(meta_tables, meta_columns)
-    gen_schema_dicts = {k: (t.tableId, dict(t.columns))
-                        for k, t in gen_schema.items()}
-    cur_schema_dicts = {k: (t.tableId, dict(t.columns))
-                        for k, t in self.schema.items()}
+    special tables of metadata. If table_ids is given, only the schema of those tables is checked
+    (unless full_schema_check is set), which is much faster in documents with many tables.
+    """
+    if table_ids is None or self.full_schema_check:
+      meta_tables = self.fetch_table('_grist_Tables')
+      meta_columns = self.fetch_table('_grist_Tables_column')
+      gen_schema = schema.build_schema(meta_tables, meta_columns)
+      gen_schema_dicts = {k: (t.tableId, dict(t.columns))
+                          for k, t in gen_schema.items()}
+      cur_schema_dicts = {k: (t.tableId, dict(t.columns))
+                          for k, t in self.schema.items()}
+    else:
+      gen_schema_dicts = {}
+      cur_schema_dicts = {}
+      for table_id in table_ids:
+        gen_table = self._build_table_schema(table_id)
+        if gen_table:
+          gen_schema_dicts[table_id] = (gen_table.tableId, dict(gen_table.columns))
+        cur_table = self.schema.get(table_id)
+        if cur_table:
+          cur_schema_dicts[table_id] = (cur_table.tableId, dict(cur_table.columns))
+
     if cur_schema_dicts != gen_schema_dicts:
       import pprint
       import difflib
@@ -496,9 +595,12 @@ class Engine(object):
     # acquired more columns in subsequent actions. We may want to check for similar situations
     # with other metadata, e.g. ViewSection fields, where they'd cause different symptoms.
     # (Or better ensure consistency by design by applying undo correctly, probably via rebase).
-    valid_table_refs = set(meta_tables.row_ids)
-    col_parent_ids = set(meta_columns.columns['parentId'])
+    meta_columns_table = self.tables['_grist_Tables_column']
+    valid_table_refs = set(self.tables['_grist_Tables'].row_ids)
+    col_parent_ids = set(meta_columns_table.get_column('parentId').raw_get_many(
+      list(meta_columns_table.row_ids)))
     if col_parent_ids > valid_table_refs:
+      meta_columns = self.fetch_table('_grist_Tables_column')
       collist = sorted(actions.transpose_bulk_action(meta_columns),
                        key=lambda c: (c.parentId, c.parentPos))
       reverse_col_id = schema.get_reverse_col_id_lookup_func(collist)
@@ -539,6 +641,31 @@ class Engine(object):
 
     self._recompute(node, row_ids)
 
+  def _use_node_for_iteration(self, node, relation, iteration, row_id):
+    """
+    Like _use_node(), for a record produced by iterating a RecordSet. The dependency edge is the
+    same for all records of the iteration, so it's registered once and remembered in it, and
+    accessing the same field of the other records only needs to check the row itself.
+    """
+    if self._peeking:
+      return
+
+    if iteration.owner is not self._current_node:
+      iteration.owner = self._current_node
+      iteration.used_nodes = set()
+    if node not in iteration.used_nodes:
+      iteration.used_nodes.add(node)
+      if self._is_current_node_formula:
+        edge = (self._current_node, node, relation)
+        if edge not in self._recompute_edge_set:
+          self.dep_graph.add_edge(*edge)
+          self._recompute_edge_set.add(edge)
+
+    if self.recompute_map.get(node) is None:
+      return
+
+    self._recompute(node, (row_id,))
+
   def _pre_update(self):
     """
     Called at beginning of _bring_all_up_to_date or _bring_mlookups_up_to_date.
@@ -603,6 +730,7 @@ class Engine(object):
         try:
           self._recompute_step(node, require_rows=row_ids)
         except OrderError as e:
+          self.counters.add("order_errors")
           # Need to schedule re-ordered evaluation
           assert node == e.requiring_node
           assert (not row_ids) or (e.requiring_row_id in row_ids)
@@ -676,12 +804,15 @@ class Engine(object):
     # In addition, we expose the triggering doc_action so that lookupOrAddDerived can avoid adding
     # a record to a derived table when the trigger itself is a change to the derived table. This
     # currently only happens on undo, and is admittedly an ugly workaround.
+    #
+    # The recompute_map keeps track of the dirty metadata lookup nodes, so that when there are
+    # none (most of the time), this is cheap even if many other nodes are dirty.
+    if not self.recompute_map.mlookup_nodes:
+      return
     self._pre_update()
     try:
       self._triggering_doc_action = triggering_doc_action
-      nodes = [node for node in self.recompute_map
-               if node.col_id.startswith('#lookup') and node.table_id.startswith('_grist_')]
-      work_items = self._make_sorted_work_items(nodes)
+      work_items = self._make_sorted_work_items(self.recompute_map.mlookup_nodes)
       self._update_loop(work_items, ignore_other_changes=True)
     finally:
       self._triggering_doc_action = None
@@ -793,7 +924,7 @@ class Engine(object):
 
     exclude = self._recompute_done_map[node]
     if dirty_rows == depend.ALL_ROWS:
-      dirty_rows = SortedSet(r for r in table.row_ids if r not in exclude)
+      dirty_rows = RowIdSet(r for r in table.row_ids if r not in exclude)
       self.recompute_map[node] = dirty_rows
 
     exempt = self._prevent_recompute_map.get(node, None)
@@ -818,7 +949,20 @@ class Engine(object):
     changes = None
     cleaned = []    # this lists row_ids that can be removed from dirty_rows once we are no
                     # longer iterating on it.
+    num_done = 0
     try:
+      # A formula may do some work for many rows at once, more efficiently than row by row.
+      prepare_rows = getattr(col.method, 'prepare_rows', None)
+      if prepare_rows and allow_evaluation and len(dirty_rows) > 1:
+        prepare_rows(dirty_rows)
+
+      # Values evaluated in worker processes, which become available once the first row got
+      # evaluated here, and the dependencies of the formula are known.
+      use_workers = (self.formula_workers > 1 and allow_evaluation and not require_rows and
+                     col.is_formula() and not column.is_virtual_column(col.col_id) and
+                     len(dirty_rows) >= WORKERS_MIN_ROWS)
+      evaluated = {}
+
       require_count = len(require_rows)
       for i, row_id in enumerate(itertools.chain(require_rows, dirty_rows)):
         required = i < require_count or require_count == 0
@@ -849,7 +993,10 @@ class Engine(object):
           # We figure out if we've hit a cycle here.  If so, we just let _recompute_on_cell
           # know, so it can set the cell value appropriately and do some other bookkeeping.
           cycle = required and (node, row_id) in self._locked_cells
-          value = self._recompute_one_cell(table, col, row_id, cycle=cycle, node=node)
+          if row_id in evaluated and not cycle:
+            value = evaluated.pop(row_id)
+          else:
+            value = self._recompute_one_cell(table, col, row_id, cycle=cycle, node=node)
         except RequestingError:
           # The formula will be evaluated again soon when we have a response.
           save_value = False
@@ -894,9 +1041,17 @@ class Engine(object):
         exclude.add(row_id)
         cleaned.append(row_id)
         self._recompute_done_counter += 1
+        num_done += 1
+
+        if use_workers:
+          use_workers = False
+          evaluated = self._evaluate_in_workers(table, col, dirty_rows, exclude)
     finally:
       self._current_node = previous_current_node
       self._is_current_node_formula = previous_is_current_node_formula
+      if num_done:
+        self.counters.add_cells(node, num_done)
+        col.check_storage()
       # Usually dirty_rows refers to self.recompute_map[node], so this modifies both
       dirty_rows -= cleaned
 
@@ -906,29 +1061,99 @@ class Engine(object):
       if not self.recompute_map[node]:
         self.recompute_map.pop(node)
 
-  def _requesting(self, key, args):
+  def _evaluate_in_workers(self, table, col, dirty_rows, exclude):
+    """
+    Evaluates the formula of col for dirty rows not in exclude, split among forked worker
+    processes. Returns a dict mapping row_id to the value, for rows evaluated successfully.
+
+    This is only done for formulas that depend solely on up-to-date columns of the same record,
+    as known from evaluating the formula for a row in this process. A worker stops at any row for
+    which the formula uses something else, and leaves formula errors and values of other than
+    simple types to normal evaluation.
+    """
+    node = col.node
+    for edge in self.dep_graph.get_dependencies(node):
+      if not (isinstance(edge.relation, IdentityRelation) and
+              edge.in_node.table_id == node.table_id and
+              table.has_column(edge.in_node.col_id) and
+              edge.in_node not in self.recompute_map):
+        return {}
+
+    row_ids = [r for r in dirty_rows if r not in exclude and r in table.row_ids]
+    if len(row_ids) < WORKERS_MIN_ROWS:
+      return {}
+    shard_size = -(-len(row_ids) // self.formula_workers)
+    shards = [row_ids[i:i + shard_size] for i in range(0, len(row_ids), shard_size)]
+    results = workers.map_in_workers(
+      functools.partial(self._evaluate_shard, table, col), shards)
+
+    evaluated = {}
+    for shard, values in zip(shards, results):
+      if values:
+        evaluated.update(zip(shard, values))
+    return evaluated
+
+  def _evaluate_shard(self, table, col, row_ids):
+    """
+    Called in a worker process to evaluate the formula of col for the given rows. Returns the
+    list of values for the rows, stopping at the first one that can't be used as is.
+    """
+    edge_count = len(self._recompute_edge_set)
+    values = []
+    for row_id in row_ids:
+      try:
+        value = self._recompute_one_cell(table, col, row_id, node=col.node)
+      except Exception:   # pylint: disable=broad-except
+        break
+      if (len(self._recompute_edge_set) != edge_count or
+          type(value) not in _WORKER_RESULT_TYPES or
+          getattr(value, 'tzinfo', None) is not None):
+        break
+      values.append(value)
+    return values
+
+  def _requesting(self, key, args, ttl=None):
     """
     Called by the REQUEST function. If we don't have a response already and we can't
     synchronously get it from the JS side, then note the request to be made in JS asynchronously
     and raise RequestingError to indicate that the formula
     should be evaluated again later when we have a response.
+
+    A response is reused for ttl seconds (REQUEST_TTL by default). Once it expires, it's still
+    returned while the request is made again, and the formula reevaluated with the new response.
     """
-    # This will make the formula reevaluate periodically with the UpdateCurrentTime action.
-    # This assumes that the response changes with time and having the latest data is ideal.
-    # We will probably want to reconsider this to avoid making unwanted requests,
-    # along with avoiding refreshing the request when the doc is loaded with the Calculate action.
-    self.use_current_time()
+    ttl = REQUEST_TTL if ttl is None else ttl
+    # This will make the formula reevaluate periodically with the UpdateCurrentTime action, once
+    # per period of ttl seconds, to refresh responses that have expired.
+    get_period = lambda: int(time.time() // ttl)
+    self.use_current_time(("request", ttl), get_period(), get_period)
 
     if key in self._request_responses:
       # This formula is being reevaluated in a RespondToRequests action, and the response is ready.
       return self._request_responses[key]
-    elif self._sync_request or key in self._cached_request_keys:
+
+    now = time.time()
+    cached = self._request_cache.get(key)
+    if cached and now - cached[1] < ttl:
+      self._request_cache.move_to_end(key)
+      return cached[0]
+
+    if self._sync_request or key in self._cached_request_keys:
       # Not always ideal, but in this case the best strategy is to make the request immediately
       # and block while waiting for a response.
-      return sandbox.call_external("request", key, args)
+      response = sandbox.call_external("request", key, args)
+      self._cache_request_response(key, response, now)
+      return response
 
-    # We can't get a response to this request now. Note the request so it can be delegated.
     table_id, column_id = self._current_node
+    in_flight = self._requests_in_flight.get(key)
+    if in_flight and now - in_flight[0] < REQUEST_TIMEOUT:
+      # The same request was already delegated by an earlier action; just note this cell to
+      # reevaluate when the response comes.
+      in_flight[1].setdefault(table_id, {}).setdefault(column_id, set()).add(self._current_row_id)
+      return self._requesting_wait(cached)
+
+    # We can't get a response to this request now. Note the request so it can be delegated.
     (self.out_actions.requests  # `out_actions.requests` is returned by apply_user_actions
          # Here is where the request arguments are stored if they haven't been already
          .setdefault(key, args)
@@ -938,11 +1163,52 @@ class Engine(object):
          .setdefault(column_id, [])
          .append(self._current_row_id))
 
+    return self._requesting_wait(cached)
+
+  def _requesting_wait(self, cached):
+    """
+    Returns the expired response from cached while waiting for a new one, if there is one, or
+    raises RequestingError.
+    """
+    if cached:
+      return cached[0]
+
     # As with OrderError, note the exception so it gets raised even if the formula catches it
     self._cell_required_error = RequestingError()
 
     raise RequestingError()
 
+  def _cache_request_response(self, key, response, received):
+    # Failures (like connection errors or a server being down) are likely to be temporary, so
+    # they aren't reused; the request is made again when a formula next needs it.
+    if "error" in response or response.get("status", 0) >= 400:
+      return
+    # The size is estimated from the content, which is typically most of it.
+    size = len(response.get("content") or b"") + 1024
+    if size > REQUEST_CACHE_BYTES:
+      return
+    old = self._request_cache.pop(key, None)
+    if old:
+      self._request_cache_bytes -= old[2]
+    self._request_cache[key] = (response, received, size)
+    self._request_cache_bytes += size
+    while self._request_cache_bytes > REQUEST_CACHE_BYTES:
+      _, (_, _, old_size) = self._request_cache.popitem(last=False)
+      self._request_cache_bytes -= old_size
+
+  def cache_request_responses(self, responses):
+    """
+    Called by the RespondToRequests action with the responses to delegated requests. Keeps them
+    for reuse, and invalidates the cells which asked for them while they were being made.
+    """
+    now = time.time()
+    for key, response in responses.items():
+      self._cache_request_response(key, response, now)
+      _, deps = self._requests_in_flight.pop(key, (None, {}))
+      for table_id, table_deps in deps.items():
+        for col_id, row_ids in table_deps.items():
+          self.dep_graph.invalidate_deps(depend.Node(table_id, col_id), row_ids, self.recompute_map)
+
   def _recompute_one_cell(self, table, col, row_id, cycle=False, node=None, record_attributes=None):
     """
     Recomputes an one formula cell and returns a value.
@@ -1131,6 +1397,10 @@ class Engine(object):
     if not self._should_rebuild_usercode:
       return
 
+    with self.counters.measure("rebuild_usercode"):
+      self._rebuild_usercode()
+
+  def _rebuild_usercode(self):
     self.gencode.make_module(self.schema)
 
     # Re-populate self.tables, reusing existing tables whenever possible.
@@ -1164,15 +1434,19 @@ class Engine(object):
     # Update docmodel with references to the updated metadata tables.
     self.docmodel.update_tables()
 
-    # Set flag to rebuild dependencies of trigger columns after any potential renames, etc.
-    self.trigger_columns_changed()
-
     # Clear the cached context used for autocompletions.
     # See the comment on _autocomplete_context in __init__.
     self._autocomplete_context = None
 
-  def trigger_columns_changed(self):
-    self._have_trigger_columns_changed = True
+  def trigger_columns_changed(self, table_ids=None):
+    """
+    Notes that dependencies of trigger columns need to be rebuilt, in the given tables, or in all
+    tables if table_ids is None.
+    """
+    if table_ids is None:
+      self._have_trigger_columns_changed = True
+    else:
+      self._trigger_tables_changed.update(table_ids)
 
   def _update_table_model(self, table, user_table):
     """
@@ -1209,20 +1483,30 @@ class Engine(object):
         self.delete_column(c)
 
   def _maybe_update_trigger_dependencies(self):
-    if not self._have_trigger_columns_changed:
+    if self._have_trigger_columns_changed:
+      table_ids = list(self.tables)
+    elif self._trigger_tables_changed:
+      table_ids = [t for t in self._trigger_tables_changed if t in self.tables]
+    else:
       return
     self._have_trigger_columns_changed = False
+    self._trigger_tables_changed = set()
 
-    # Without being very smart, if trigger-formula dependencies change for any columns, rebuild
-    # them for all columns. Specifically, we will create nodes and edges in the dependency graph.
-    for table_id, table in self.tables.items():
+    # Rebuild trigger-formula dependencies for all columns of the affected tables. Specifically,
+    # we will create nodes and edges in the dependency graph.
+    for table_id in table_ids:
       if table_id.startswith('_grist_'):
         # We can skip metadata tables, there are no trigger-formulas there.
         continue
-      for col_id, col_obj in table.all_columns.items():
+      col_recs = None
+      for col_id, col_obj in self.tables[table_id].all_columns.items():
         if col_obj.is_formula() or not col_obj.has_formula():
           continue
-        col_rec = self.docmodel.columns.lookupOne(tableId=table_id, colId=col_id)
+        if col_recs is None:
+          table_rec = self.docmodel.tables.lookupOne(tableId=table_id)
+          col_recs = {c.colId: c for c in table_rec.columns}
+        col_rec = col_recs.get(col_id) or self.docmodel.columns.lookupOne(tableId=table_id,
+                                                                           colId=col_id)
 
         out_node = depend.Node(table_id, col_id)
         rel = SingleRowsIdentityRelation(table_id)
@@ -1265,16 +1549,41 @@ class Engine(object):
     self.dep_graph.invalidate_deps(self._current_time_node, depend.ALL_ROWS, self.recompute_map,
                                    include_self=False)
 
-  def use_current_time(self):
+    # Nodes for coarser periods of time only get invalidated when the period has changed.
+    for node, (get_period, period) in list(self._time_periods.items()):
+      current_period = get_period()
+      if current_period != period:
+        self._time_periods[node] = (get_period, current_period)
+        self.dep_graph.invalidate_deps(node, depend.ALL_ROWS, self.recompute_map,
+                                       include_self=False)
+
+  def use_current_time(self, period_key=None, period=None, get_period=None):
     """
     Add a dependency on the current time to the current evaluating node,
     so that calling update_current_time() will invalidate the node and cause its reevaluation.
+
+    A formula that only depends on a coarser period of time, e.g. the current date, may pass in
+    a hashable period_key identifying the kind of period, e.g. ('day', tz), the current period
+    as seen by the formula, and a function to compute the current period. It then only gets
+    reevaluated once that period changes.
     """
     if not self._current_node:
       return
     table_id = self._current_node[0]
     table = self.tables[table_id]
-    self._use_node(self._current_time_node, table._identity_relation)
+    if period_key is None:
+      self._use_node(self._current_time_node, table._identity_relation)
+      return
+
+    node = ("#now", period_key)
+    known = self._time_periods.get(node)
+    if known is None:
+      self._time_periods[node] = (get_period, period)
+    elif known[1] != period:
+      # The formula saw a different period than others did (e.g. if the date changed in between).
+      # Forget the period, to make sure all of them are reevaluated on the next update.
+      self._time_periods[node] = (get_period, None)
+    self._use_node(node, table._identity_relation)
 
   _current_time_node = ("#now", None)
 
@@ -1313,7 +1622,7 @@ class Engine(object):
     checkpoint = self._get_undo_checkpoint()
     try:
       for user_action in user_actions:
-        self._schema_updated = False
+        self._schema_updated_tables = set()
 
         # At the start of each useraction, clear exemptions. These are used to avoid recalcs of
         # trigger-formula columns for which the same useractions sets an explicit value.
@@ -1322,8 +1631,8 @@ class Engine(object):
         self.out_actions.retValues.append(self._apply_one_user_action(user_action))
 
         # If the UserAction touched the schema, check that it is now consistent with metadata.
-        if self._schema_updated:
-          self.assert_schema_consistent()
+        if self._schema_updated_tables:
+          self.assert_schema_consistent(self._schema_updated_tables)
 
     except Exception as e:
       # Save full exception info, so that we can rethrow accurately even if undo also fails.
@@ -1337,8 +1646,8 @@ class Engine(object):
       # Check schema consistency again. If this fails, something is really wrong (we tried to go
       # back to a good state but failed). We'll just report it loudly.
       try:
-        if self._schema_updated:
-          self.assert_schema_consistent()
+        if self._schema_updated_tables:
+          self.assert_schema_consistent(self._schema_updated_tables)
       except Exception:
         log.error("Inconsistent schema after revert on failure: %s", traceback.format_exc())
       raise
@@ -1355,6 +1664,17 @@ class Engine(object):
 
     self.out_actions.flush_calc_changes()
     self.out_actions.check_sanity()
+    # Requests delegated by these actions are in flight until RespondToRequests.
+    now = time.time()
+    for key, request in self.out_actions.requests.items():
+      # Note all the cells waiting for the response. A request made again after REQUEST_TIMEOUT
+      # keeps those that were waiting for it before, in case the earlier response never comes.
+      in_flight = self._requests_in_flight.get(key)
+      waiting = in_flight[1] if in_flight else {}
+      for table_id, table_deps in request["deps"].items():
+        for col_id, row_ids in table_deps.items():
+          waiting.setdefault(table_id, {}).setdefault(col_id, set()).update(row_ids)
+      self._requests_in_flight[key] = (now, waiting)
     self._user = None
     self._request_responses = {}
     self._cached_request_keys = set()
@@ -1386,10 +1706,14 @@ class Engine(object):
     action_name = doc_action.__class__.__name__
     saved_schema = None
     if action_name in actions.schema_actions:
-      self._schema_updated = True
+      # Schema actions start with the table_id, except RenameTable, which has old and new ones.
+      table_ids = doc_action[:2] if action_name == 'RenameTable' else doc_action[:1]
+      self._schema_updated_tables.update(table_ids)
+      # Dependencies of trigger columns in these tables may be affected by renames, etc.
+      self.trigger_columns_changed(table_ids)
       # Make a copy of the schema. If a bug causes a docaction to fail after modifying schema, we
       # restore it, or we'll end up with mismatching schema and metadata.
-      saved_schema = schema.clone_schema(self.schema)
+      saved_schema = schema.clone_schema(self.schema, table_ids)
 
     try:
       getattr(self.doc_actions, action_name)(*doc_action)
@@ -1400,6 +1724,7 @@ class Engine(object):
         log.info("Restoring schema and usercode on exception")
         self.schema = saved_schema
         self._should_rebuild_usercode = True
+        self.trigger_columns_changed()
         try:
           self.rebuild_usercode()
         except Exception:
@@ -1535,7 +1860,7 @@ class Engine(object):
       (len_calc, len_stored, len_undo, len_ret) = checkpoint
       undo_actions = self.out_actions.undo[len_undo:]
       log.info("Reverting %d doc actions", len(undo_actions))
-      self.user_actions.ApplyUndoActions([actions.get_action_repr(a) for a in undo_actions])
+      self.user_actions.doApplyUndoActions(undo_actions)
       del self.out_actions.calc[len_calc:]
       del self.out_actions.stored[len_stored:]
       del self.out_actions.direct[len_stored:]
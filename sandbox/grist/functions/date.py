@@ -503,7 +503,14 @@ def TODAY(tz=None):
   """
   Returns the `date` object for the current date.
   """
-  return NOW(tz=tz).date()
+  today = _today(tz)
+  # The result only changes once a day, so depend on the current date rather than the exact time.
+  engine = docmodel.global_docmodel._engine
+  engine.use_current_time(('day', tz), today, lambda: _today(tz))
+  return today
+
+def _today(tz):
+  return datetime.datetime.now(_get_tzinfo(tz)).date()
 
 
 _weekday_type_map = {
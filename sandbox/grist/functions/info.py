@@ -703,16 +703,22 @@ def _replicate_requests_body_args(data=None, json=None):
 # and marks it as unimplemented in the docs.
 # It also makes grist-help expect to see the string 'raise NotImplemented' in the function source,
 # which it does now, because of this comment. Removing this comment will currently break the docs.
-def REQUEST(url, params=None, headers=None, method="GET", data=None, json=None):
+def REQUEST(url, params=None, headers=None, method="GET", data=None, json=None, ttl=None):
   # Makes an HTTP request with an API similar to `requests.request`.
   # Actually jumps through hoops internally to make the request asynchronously (usually)
   # while feeling synchronous to the formula writer.
 
+  # Responses are reused by all formulas making the same request, for `ttl` seconds (an hour by
+  # default), after which the request is made again.
+
   # When making a POST or PUT request, REQUEST supports `data` and `json` args, from `requests.request`:
   #   - `args` as str: Used as the request body
   #   - `args` as other types: Form encoded and used as the request body. The correct header is also set.
   #   - `json` as str: Used as the request body. The correct header is also set.
   #   - `json` as other types: JSON encoded and set as the request body. The correct header is also set.
+  if ttl is not None and not ttl > 0:
+    raise ValueError("`ttl` must be a positive number of seconds")
+
   body, _headers = _replicate_requests_body_args(data=data, json=json)
 
   # Extra headers that make us consistent with requests.post must not override
@@ -728,7 +734,7 @@ def REQUEST(url, params=None, headers=None, method="GET", data=None, json=None):
 
   # This may either return the raw response data or it may raise a special exception
   # to delegate the request and reevaluate the formula later.
-  response_dict = docmodel.global_docmodel._engine._requesting(key, args)
+  response_dict = docmodel.global_docmodel._engine._requesting(key, args, ttl)
 
   if "error" in response_dict:
     # Indicates a complete failure to make the request, such as a connection problem.
@@ -44,6 +44,22 @@ def _chain_numeric_or_date(*values_or_iterables):
       yield v
 
 
+# Types of values handled by _plain_numbers().
+_plain_number_types = frozenset((float, int, type(None)))
+
+def _plain_numbers(value, more_values):
+  """
+  Fast path for aggregate functions called with a single list of numbers and Nones, as is
+  common for `$group.Amount` in summary tables. Returns the list of numbers with Nones omitted,
+  or None if the arguments aren't of this form (e.g. include bools, dates or strings), in which
+  case the general _chain_* helpers should be used.
+  """
+  # pylint: disable=unidiomatic-typecheck
+  if more_values or type(value) is not list or not _plain_number_types.issuperset(map(type, value)):
+    return None
+  return [v for v in value if v is not None]
+
+
 def _round_toward_zero(value):
   return _math.floor(value) if value >= 0 else _math.ceil(value)
 
@@ -799,6 +815,9 @@ def SUM(value1, *more_values):
   >>> SUM([True, "3", 4], True)
   6
   """
+  numbers = _plain_numbers(value1, more_values)
+  if numbers is not None:
+    return sum(numbers)
   return sum(_chain_numeric_a(value1, *more_values))
 
 
@@ -1,7 +1,7 @@
 # pylint: disable=redefined-builtin, line-too-long, unused-argument
 import datetime
 
-from .math import _chain, _chain_numeric, _chain_numeric_a, _chain_numeric_or_date
+from .math import _chain, _chain_numeric, _chain_numeric_a, _chain_numeric_or_date, _plain_numbers
 from .info import ISNUMBER, ISLOGICAL
 from .date import DATE, DTIME       # pylint: disable=unused-import
 from .unimplemented import unimplemented
@@ -49,7 +49,8 @@ def AVERAGE(value, *more_values):
     ...
   ZeroDivisionError: float division by zero
   """
-  return _average(_chain_numeric(value, *more_values))
+  numbers = _plain_numbers(value, more_values)
+  return _average(_chain_numeric(value, *more_values) if numbers is None else numbers)
 
 
 def AVERAGEA(value, *more_values):
@@ -294,6 +295,9 @@ def MAX(value, *more_values):
   >>> MAX(DATE(2015, 1, 2), datetime.datetime(2015, 1, 1, 12, 34, 56))
   datetime.date(2015, 1, 2)
   """
+  numbers = _plain_numbers(value, more_values)
+  if numbers is not None:
+    return max(numbers) if numbers else 0
   values = _default_if_empty(_chain_numeric_or_date(value, *more_values), 0)
   return max(values, key=_compare_date_datetime_key)
 
@@ -389,6 +393,9 @@ def MIN(value, *more_values):
   >>> MIN(DATE(2015, 1, 2), datetime.datetime(2015, 1, 1, 12, 34, 56))
   datetime.datetime(2015, 1, 1, 12, 34, 56)
   """
+  numbers = _plain_numbers(value, more_values)
+  if numbers is not None:
+    return min(numbers) if numbers else 0
   values = _default_if_empty(_chain_numeric_or_date(value, *more_values), 0)
   return min(values, key=_compare_date_datetime_key)
 
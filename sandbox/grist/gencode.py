@@ -16,8 +16,9 @@ The schema for grist data is:
   }
 """
 import logging
+import re
 import types
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 
 import codebuilder
 from column import is_visible_column
@@ -29,6 +30,14 @@ log = logging.getLogger(__name__)
 
 indent_str = "  "
 
+# Matches identifier-like words in a formula. Any Grist name (table or column) that a formula
+# mentions, including in keyword arguments and order_by strings, appears in it as such a word.
+_word_re = re.compile(r'\w+')
+
+# An entry in GenCode's formula cache: the generated body of the formula, and the set of words in
+# the formula, used to find quickly the formulas that might mention a given name.
+FormulaCacheEntry = namedtuple('FormulaCacheEntry', ('body', 'words'))
+
 #----------------------------------------------------------------------
 
 def get_grist_type(col_type, reverse_col_id=None):
@@ -57,14 +66,20 @@ class GenCode:
   functions and producing a Python specification of all the tables with data and formula fields.
 
   To save the costly work of generating formula code, it maintains a formula cache. It is a
-  dictionary mapping (table_id, col_id, formula) to a textbuilder.Builder. On each run of
+  dictionary mapping (table_id, col_id, formula) to a FormulaCacheEntry. On each run of
   make_module(), it will use the previously cached values for lookups, and replace the contents
   of the cache with current values. If ever we need to generate code for unrelated schemas, to
   benefit from the cache, a separate GenCode object should be used for each schema.
+
+  It also maintains a formula index, mapping (table_id, func_name) of each generated formula
+  function to the set of words in its formula. It allows grist_names() to skip formulas that
+  can't mention any of the names of interest.
   """
   def __init__(self):
     self._formula_cache = {}
     self._new_formula_cache = {}
+    self._formula_index = {}
+    self._new_formula_index = {}
     self._full_builder = None
     self._user_builder = None
     self._usercode = None
@@ -82,15 +97,20 @@ class GenCode:
 
     # This is where we get to use the formula cache, and save the work of rebuilding formulas.
     key = (table_id, col_info.colId, col_info.formula)
-    body = self._formula_cache.get(key)
-    if body is None:
+    entry = self._formula_cache.get(key)
+    # If we have a table_id like `Table._Summary`, then we don't want to actually associate
+    # this field with any real table/column.
+    is_summary_info = table_id.endswith("._Summary")
+    if entry is None:
       default = get_type_default(col_info.type)
-      # If we have a table_id like `Table._Summary`, then we don't want to actually associate
-      # this field with any real table/column.
-      assoc_value = None if table_id.endswith("._Summary") else (table_id, col_info.colId)
+      assoc_value = None if is_summary_info else (table_id, col_info.colId)
       body = codebuilder.make_formula_body(col_info.formula, default, assoc_value,
           indent=indent_str + indent)
-    self._new_formula_cache[key] = body
+      entry = FormulaCacheEntry(body, frozenset(_word_re.findall(col_info.formula or '')))
+    self._new_formula_cache[key] = entry
+    if not is_summary_info:
+      self._new_formula_index[(table_id, name)] = entry.words
+    body = entry.body
 
     decorator = ''
     if include_type and col_info.type != 'Any':
@@ -186,6 +206,8 @@ class GenCode:
     # Once all formulas are generated, replace the formula cache with the newly-populated version.
     self._formula_cache = self._new_formula_cache
     self._new_formula_cache = {}
+    self._formula_index = self._new_formula_index
+    self._new_formula_index = {}
     self._full_builder = textbuilder.Combiner(fullparts)
     self._user_builder = textbuilder.Combiner(userparts)
     self._usercode = exec_module_text(self._full_builder.get_text())
@@ -199,8 +221,19 @@ class GenCode:
     """Returns the generated usercode module."""
     return self._usercode
 
-  def grist_names(self):
-    return codebuilder.parse_grist_names(self._full_builder)
+  def grist_names(self, names=None):
+    """
+    Returns the Grist names mentioned in formulas, as described in codebuilder.parse_grist_names().
+    If names is given, only the formulas that contain any of these names (as table or column IDs)
+    get parsed, which is much cheaper than parsing all formulas when only a few are affected.
+    """
+    if names is None:
+      return codebuilder.parse_grist_names(self._full_builder)
+
+    formulas = {func for func, words in self._formula_index.items() if not words.isdisjoint(names)}
+    if not formulas:
+      return []
+    return codebuilder.parse_grist_names(self._full_builder, formulas)
 
 
 def _is_special_table(table_id):
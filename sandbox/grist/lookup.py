@@ -63,12 +63,16 @@ class NoValueColumn(column.BaseColumn):
   # values. To outside code, it looks like a column of None's.
   def raw_get(self, row_id):
     return None
+  def raw_get_many(self, row_ids):
+    return [None] * len(row_ids)
   def convert(self, value_to_convert):
     return None
   def get_cell_value(self, row_id, restore=False):
     return None
   def set(self, row_id, value):
     pass
+  def unset_rows(self, row_ids):
+    pass
 
 
 class LookupMapColumn(NoValueColumn):
@@ -160,6 +164,13 @@ class LookupMapColumn(NoValueColumn):
     affected_keys = self._mapping.remove_row_id(row_id)
     self._relation_tracker.invalidate_affected_keys(affected_keys)
 
+  def unset_rows(self, row_ids):
+    # When removing many records, collect all affected keys to invalidate them in one pass.
+    affected_keys = set()
+    for row_id in row_ids:
+      affected_keys.update(self._mapping.remove_row_id(row_id))
+    self._relation_tracker.invalidate_affected_keys(affected_keys)
+
   def _get_keys(self, row_id):
     # For _LookupRelation to know which keys are affected when the given looked-up row_id changes.
     return self._mapping.get_mapped_keys(row_id)
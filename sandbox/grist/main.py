@@ -62,6 +62,7 @@ def _decode_db_value(value):
 
 def run(sandbox):
   eng = engine.Engine()
+  eng.counters.track_gc()
 
   def export(method):
     # Wrap each method so that it logs a message that it's being called.
@@ -122,10 +123,20 @@ def run(sandbox):
   def get_table_stats():
     return eng.get_table_stats()
 
+  @export
+  def get_engine_counters():
+    # Returns the counters accumulated since the previous call.
+    result = eng.counters.get()
+    result["sandbox_calls"] = sandbox.get_call_stats()
+    return result
+
   @export
   def create_migrations(all_tables, metadata_only=False):
+    # User tables needed by migrations are fetched one at a time, rather than all of them at once.
+    fetch_table = lambda t: table_data_from_db(t, sandbox.call_external("fetchTable", t))
     doc_actions = migrations.create_migrations(
-      {t: table_data_from_db(t, data) for t, data in all_tables.items()}, metadata_only)
+      {t: table_data_from_db(t, data) for t, data in all_tables.items()}, metadata_only,
+      fetch_table)
     return [actions.get_action_repr(action) for action in doc_actions]
 
   @export
@@ -160,16 +171,20 @@ def run(sandbox):
 
   @export
   def start_timing():
+    # Discard cache stats collected so far, so that they cover the same period as timings.
+    eng.record_rich_value_cache_stats()
     eng._timing = Timing()
 
   @export
   def stop_timing():
+    eng.record_rich_value_cache_stats()
     stats = eng._timing.get()
     eng._timing = DummyTiming()
     return stats
 
   @export
   def get_timings():
+    eng.record_rich_value_cache_stats()
     return eng._timing.get(False)
 
   # Echo input for testing
@@ -40,18 +40,21 @@ all_migrations = {}
 def noop_migration(_all_tables):
   return []
 
-# Each migration function includes a .need_all_tables attribute. See migration() decorator.
-noop_migration.need_all_tables = False
+# Each migration function includes a .need_tables attribute. See migration() decorator.
+noop_migration.need_tables = None
 
 
-def create_migrations(all_tables, metadata_only=False):
+def create_migrations(all_tables, metadata_only=False, fetch_table=None):
   """
   Creates and returns a list of DocActions needed to bring this document to
   schema.SCHEMA_VERSION.
     all_tables: all tables or just the metadata tables (those named with _grist_ prefix) as a
       dictionary mapping table name to TableData.
-    metadata_only: should be set if only metadata tables are passed in. If ALL tables are
-      required to process migrations, this method will raise a "need all tables..." exception.
+    metadata_only: should be set if only metadata tables are passed in. If the data of user tables
+      is required to process migrations, and fetch_table isn't given, this method will raise a
+      "need all tables..." exception.
+    fetch_table: optional function mapping a table name to its TableData, used to load the data of
+      only those user tables which migrations need, one table at a time.
   """
   try:
     doc_version = all_tables['_grist_DocInfo'].columns["schemaVersion"][0]
@@ -89,12 +92,19 @@ def create_migrations(all_tables, metadata_only=False):
     # And load in the original data, interpreting the TableData object as BulkAddRecord action.
     tdset.apply_doc_action(actions.BulkAddRecord(*data))
 
+  loaded_tables = set(all_tables)
   migration_actions = []
   for version in range(doc_version + 1, schema.SCHEMA_VERSION + 1):
     migration_func = all_migrations.get(version, noop_migration)
-    if migration_func.need_all_tables and metadata_only:
-      raise Exception("need all tables for migration to %s" % version)
-    migration_actions.extend(all_migrations.get(version, noop_migration)(tdset))
+    if migration_func.need_tables and metadata_only:
+      for table_id in migration_func.need_tables(tdset):
+        if table_id in loaded_tables:
+          continue
+        if not fetch_table:
+          raise Exception("need all tables for migration to %s" % version)
+        tdset.apply_doc_action(actions.BulkAddRecord(*fetch_table(table_id)))
+        loaded_tables.add(table_id)
+    migration_actions.extend(migration_func(tdset))
 
   # Note that if we are downgrading versions (i.e. doc_version is higher), then the following is
   # the only action we include into the migration.
@@ -109,19 +119,21 @@ def get_last_migration_version():
   """
   return max(all_migrations)
 
-def migration(schema_version, need_all_tables=False):
+def migration(schema_version, need_tables=None):
   """
   Decorator for migrations that associates the decorated migration function with the given
   schema_version. This decorated function will be run to migrate forward to schema_version.
 
-  Migrations are first attempted with only metadata tables, but if any required migration function
-  is marked with need_all_tables=True, then the migration will be retried with all tables.
+  Migrations are run with only metadata tables. If a migration needs the data of user tables,
+  need_tables should be a function that takes the TableDataSet and returns the ids of those
+  tables. Their data then gets fetched before running the migration (or if that's not possible,
+  the migration will be retried with all tables).
 
-  NOTE: new migrations should NOT set need_all_tables=True; it would require more work to process
-  very large documents safely (including those containing on-demand tables).
+  NOTE: new migrations should NOT set need_tables; it would require more work to process very
+  large documents safely (including those containing on-demand tables).
   """
   def add_migration(migration_func):
-    migration_func.need_all_tables = need_all_tables
+    migration_func.need_tables = need_tables
     all_migrations[schema_version] = migration_func
     return migration_func
   return add_migration
@@ -684,9 +696,18 @@ def migration16(tdset):
 
   return tdset.apply_doc_actions(doc_actions)
 
-# This is actually the only migration that requires all tables because it modifies user data
+def _image_column_tables(tdset):
+  """
+  Returns the ids of the tables with data columns of the deprecated "Image" type.
+  """
+  tables_map = {t.id: t for t in actions.transpose_bulk_action(tdset.all_tables['_grist_Tables'])}
+  columns = actions.transpose_bulk_action(tdset.all_tables['_grist_Tables_column'])
+  return sorted({tables_map[c.parentId].tableId for c in columns
+                 if c.type == 'Image' and not c.isFormula})
+
+# This is actually the only migration that requires user tables because it modifies user data
 # (specifically, any columns of the deprecated "Image" type).
-@migration(schema_version=17, need_all_tables=True)
+@migration(schema_version=17, need_tables=_image_column_tables)
 def migration17(tdset):
   """
   There is no longer an "Image" type for columns, as "Attachments" now serves as a
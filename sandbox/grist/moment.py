@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta, tzinfo as _tzinfo
 from collections import namedtuple
 import marshal
+import mmap
 from time import time
 import bisect
 import os
+import struct
 import iso8601
 
 try:
@@ -23,24 +25,59 @@ DATE_EPOCH = EPOCH.date()
 
 CURRENT_DATE = DATE_EPOCH + timedelta(seconds=time())
 
-_TZDATA = None
+# The tzdata file (produced by sandbox/install_tz.js) is indexed, so that only the zones actually
+# used need to be decoded. It consists of:
+#   - 4 bytes: little-endian length of the marshalled index that follows;
+#   - marshalled index: a list of tuples (name, start, end), in the order of zones in moment;
+#   - marshalled data for each zone: a tuple (name, abbrs, offsets, untils), at [start, end)
+#     relative to the end of the index.
+_TZDATA_FILE = os.path.join(os.path.dirname(__file__), "tzdata.data")
 
-# Returns a dictionary mapping timezone name to ZoneRecord object. It reads the data on first
-# call, caches it, and returns cached data on all future calls.
-def get_tz_data():
-  global _TZDATA    # pylint: disable=global-statement
-  if _TZDATA is None:
-    all_zones = read_tz_raw_data()
-    # The marshalled data is an array of tuples (name, abbrs, offsets, untils)
-    _TZDATA = {x[0]: ZoneRecord._make(x) for x in all_zones}
-  return _TZDATA
+_tz_file = None
 
-# Reads and returns the marshalled tzdata file (produced by sandbox/install_tz.py).
-# The return value is a list of tuples (name, abbrs, offsets, untils).
+class _TzDataFile(object):
+  """
+  Gives access to the zone records in the tzdata file, mapped into memory when possible.
+  """
+  def __init__(self, path):
+    with open(path, "rb") as f:
+      try:
+        self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      except (OSError, ValueError):
+        # Fall back to reading the file when mmap isn't supported (e.g. in some sandboxes).
+        self._data = f.read()
+    (index_len,) = struct.unpack_from("<I", self._data, 0)
+    self._data_start = 4 + index_len
+    # List of (name, start, end) tuples, and a mapping of names to them.
+    self.index = marshal.loads(self._data[4:self._data_start])
+    self._zones = {entry[0]: entry for entry in self.index}
+
+  def read_zone(self, name):
+    """Returns the raw tuple (name, abbrs, offsets, untils) for the given zone."""
+    _, start, end = self._zones[name]
+    return marshal.loads(self._data[self._data_start + start : self._data_start + end])
+
+def _get_tz_file():
+  global _tz_file    # pylint: disable=global-statement
+  if _tz_file is None:
+    _tz_file = _TzDataFile(_TZDATA_FILE)
+  return _tz_file
+
+def get_zone_record(zonelabel):
+  """
+  Returns the ZoneRecord for the given timezone name, decoding only that zone's data. Raises
+  KeyError for unknown names.
+  """
+  return ZoneRecord._make(_get_tz_file().read_zone(zonelabel))
+
+def get_zone_names():
+  """Returns the list of all known timezone names."""
+  return [entry[0] for entry in _get_tz_file().index]
+
+# Reads and returns the data for all zones, as a list of tuples (name, abbrs, offsets, untils).
 def read_tz_raw_data():
-  tzfile = os.path.join(os.path.dirname(__file__), "tzdata.data")
-  with open(tzfile, "rb") as tzdata:
-    return marshal.load(tzdata)
+  tz_file = _get_tz_file()
+  return [tz_file.read_zone(name) for name in get_zone_names()]
 
 
 # Converts a UTC datetime to timestamp in milliseconds.
@@ -172,7 +209,7 @@ class Zone(object):
     Creates a Zone object for the given zonelabel, which must be a string key into the
     moment-timezone json data.
     """
-    zone_data = get_tz_data()[zonelabel]
+    zone_data = get_zone_record(zonelabel)
     self.name = zonelabel
     self.untils = zone_data.untils[:-1]   # In ms. We omit the trailing None value.
     self.abbrs = zone_data.abbrs
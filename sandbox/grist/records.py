@@ -57,19 +57,20 @@ class Record(object):
   )
 
   # Slots are an optimization to avoid the need for a per-object __dict__.
-  __slots__ = ('_row_id', '_source_relation')
+  __slots__ = ('_row_id', '_source_relation', '_iteration')
 
   # Per-table derived classes override this and set it to the appropriate Table object.
   _table = None
 
   # Record is always a thin class, containing essentially a reference to a row in the table. The
   # properties to access individual fields of a row are provided in per-table derived classes.
-  def __init__(self, row_id, relation=None):
+  def __init__(self, row_id, relation=None, iteration=None):
     """
     Creates a Record object.
       table - Table object, in which this record lives.
       row_id - The ID of the record within table.
       relation - Relation object for how this record was obtained; used in dependency tracking.
+      iteration - RecordSetIteration when the record is produced by iterating a RecordSet.
 
     In general you shouldn't call this constructor directly, but rather:
 
@@ -79,6 +80,7 @@ class Record(object):
     """
     self._row_id = row_id
     self._source_relation = relation or self._table._identity_relation
+    self._iteration = iteration
 
   # Existing fields are added as @property methods in table.py. When no field is found, raise a
   # more informative AttributeError.
@@ -177,8 +179,13 @@ class RecordSet(object):
     return not self.__eq__(other)
 
   def __iter__(self):
+    # Records produced here share a RecordSetIteration, so that a field they access registers its
+    # dependency edge once, rather than once per record.
+    iteration = RecordSetIteration()
+    make_record = self._table.Record
+    relation = self._source_relation
     for row_id in self._row_ids:
-      yield self._table.Record(row_id, self._source_relation)
+      yield make_record(row_id, relation, iteration)
 
   def __contains__(self, item):
     """item may be a Record or its row_id."""
@@ -330,6 +337,19 @@ class RecordSet(object):
     i = self._bisect_index(bisect_func, search_row_id, search_values=search_values)
     return self._at(i + shift)
 
+class RecordSetIteration(object):
+  """
+  Shared by the records produced by one iteration over a RecordSet. It keeps track of the nodes
+  for which the engine has already registered a dependency edge on behalf of the formula being
+  evaluated (owner), so that accessing them again for other records skips that bookkeeping.
+  """
+  __slots__ = ('owner', 'used_nodes')
+
+  def __init__(self):
+    self.owner = None
+    self.used_nodes = set()
+
+
 _min_row_id = -sys.float_info.max
 _max_row_id = sys.float_info.max
 
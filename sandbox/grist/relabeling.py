@@ -91,7 +91,9 @@ def prepare_inserts_dumb(sortedlist, keys):
 
 def prepare_inserts(sortedlist, keys):
   """
-  Takes a SortedListWithKey and a list of keys to insert. The keys should be floats.
+  Takes a SortedListWithKey and a list of keys to insert. The keys should be floats. Instead of a
+  SortedListWithKey, sortedlist may be any object offering its `_key` function, len(), indexing,
+  and bisect_key_left(), which allows it to be a view of an existing index rather than a copy.
   Returns two lists: [(index, new_key), ...], [new_keys...]
 
   The first list contains pairs for existing items in sortedlist that need to be adjusted to have
@@ -10,6 +10,7 @@ Relations can be determined by a foreign key or another form of lookup, and they
 
 """
 import depend
+from row_id_set import RowIdSet
 
 class Relation(object):
   """
@@ -111,7 +112,9 @@ class ReferenceRelation(Relation):
   """
   def __init__(self, referring_table, target_table, ref_col_id):
     super(ReferenceRelation, self).__init__(referring_table, target_table)
-    self.inverse_map = {}     # maps target rows to sets of referring rows
+    # Maps target rows to referring rows. To keep this compact for large tables, a target row
+    # referred to by a single row maps to that row id, and otherwise to a RowIdSet.
+    self.inverse_map = {}
     self._ref_col_id = ref_col_id
 
   def __str__(self):
@@ -123,15 +126,54 @@ class ReferenceRelation(Relation):
     if input_rows == depend.ALL_ROWS:
       return depend.ALL_ROWS
     affected_rows = set()
+    inverse_map = self.inverse_map
     for target_row_id in input_rows:
-      affected_rows.update(self.inverse_map.get(target_row_id, ()))
+      referring = inverse_map.get(target_row_id)
+      if referring is None:
+        continue
+      if type(referring) is int:
+        affected_rows.add(referring)
+      else:
+        affected_rows.update(referring)
     return affected_rows
 
+  def get_referring_rows(self, target_row_id):
+    """
+    Returns a sorted list of the rows referring to the given target row.
+    """
+    referring = self.inverse_map.get(target_row_id)
+    if referring is None:
+      return []
+    return [referring] if type(referring) is int else list(referring)
+
+  def get_referring_count(self, target_row_id):
+    """
+    Returns the number of rows referring to the given target row.
+    """
+    referring = self.inverse_map.get(target_row_id)
+    if referring is None:
+      return 0
+    return 1 if type(referring) is int else len(referring)
+
   def add_reference(self, referring_row_id, target_row_id):
-    self.inverse_map.setdefault(target_row_id, set()).add(referring_row_id)
+    referring = self.inverse_map.get(target_row_id)
+    if referring is None:
+      self.inverse_map[target_row_id] = referring_row_id
+    elif type(referring) is int:
+      if referring != referring_row_id:
+        self.inverse_map[target_row_id] = RowIdSet((referring, referring_row_id))
+    else:
+      referring.add(referring_row_id)
 
   def remove_reference(self, referring_row_id, target_row_id):
-    self.inverse_map[target_row_id].discard(referring_row_id)
+    referring = self.inverse_map.get(target_row_id)
+    if type(referring) is int:
+      if referring == referring_row_id:
+        del self.inverse_map[target_row_id]
+    elif referring is not None:
+      referring.discard(referring_row_id)
+      if len(referring) == 1:
+        self.inverse_map[target_row_id] = next(iter(referring))
 
   def clear(self):
     self.inverse_map.clear()
@@ -1,3 +1,4 @@
+import bisect
 from collections import defaultdict
 from usertypes import get_referenced_table_id
 
@@ -6,9 +7,11 @@ class _RefUpdates(object):
     self.removals = set()
     self.additions = set()
 
-def get_reverse_adjustments(row_ids, old_values, new_values, value_iterator, relation):
+def get_reverse_adjustments(row_ids, old_values, new_values, value_iterator):
   """
-  Generates data for updating reverse columns, based on changes to this column
+  Generates data for updating reverse columns, based on changes to this column. Returns a list of
+  triples (target_row_id, removals, additions), with the sets of row_ids of this column to remove
+  from and add to the reverse value of each affected target row.
   """
 
   # Stores removals and addons for each target row
@@ -23,26 +26,30 @@ def get_reverse_adjustments(row_ids, old_values, new_values, value_iterator, rel
       for target_row_id in value_iterator(new_value):
         affected_target_rows[target_row_id].additions.add(source_row_id)
 
-  # Now in affected_target_rows, we have the changes (deltas), now we are going to convert them
-  # to updates (full list of values) in target columns.
+  return [(target_row_id, updates.removals - updates.additions, updates.additions)
+          for target_row_id, updates in affected_target_rows.items()]
 
-  adjustments = []
 
-  # For each target row (that needs to be updated, and was change in our column)
-  for target_row_id, updates in affected_target_rows.items():
-    # Get the value stored in that column by using our own relation object (which should store
-    # correct values - the same that are stored in that reverse column). `reverse_value` is the
-    # value in that reverse cell
-    reverse_value = relation.get_affected_rows((target_row_id,))
+# Beyond this many changes to one reverse value, it's cheaper to rebuild the list than to
+# insert and delete items one at a time.
+_MAX_INCREMENTAL_CHANGES = 64
 
-    # Now make the adjustments using calculated deltas
-    for source_row_id in updates.removals:
-      reverse_value.discard(source_row_id)
-    for source_row_id in updates.additions:
-      reverse_value.add(source_row_id)
-    adjustments.append((target_row_id, sorted(reverse_value)))
-
-  return adjustments
+def apply_deltas(sorted_list, removals, additions):
+  """
+  Modifies sorted_list in place to remove the given removals and add the given additions, in time
+  proportional to their number rather than to the length of the list, which may be large.
+  """
+  if len(removals) + len(additions) > _MAX_INCREMENTAL_CHANGES:
+    sorted_list[:] = sorted(set(sorted_list).difference(removals).union(additions))
+    return
+  for row_id in removals:
+    i = bisect.bisect_left(sorted_list, row_id)
+    if i < len(sorted_list) and sorted_list[i] == row_id:
+      del sorted_list[i]
+  for row_id in additions:
+    i = bisect.bisect_left(sorted_list, row_id)
+    if i == len(sorted_list) or sorted_list[i] != row_id:
+      sorted_list.insert(i, row_id)
 
 
 def check_desired_reverse_col(col_type, desired_reverse_col):
@@ -0,0 +1,318 @@
+"""
+RowIdSet is a compact set of integer row ids, for use where Python sets of boxed ints would take
+too much memory, e.g. in the reverse-reference index of a large table, or for the rows of a column
+that need to be recomputed.
+
+It follows the approach of Roaring bitmaps: row ids are grouped into chunks of 2^16 by their high
+bits. A chunk is stored as a sorted array of the low 16 bits while it's sparse, and as a bitmap
+once it holds more than 4096 ids (at which point the 8KB bitmap is the smaller of the two). This
+keeps the cost of add() and discard() bounded by the chunk size, and the cost of iteration
+proportional to the number of ids.
+"""
+from array import array
+import bisect
+import itertools
+
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+_BITMAP_BYTES = (1 << _CHUNK_BITS) // 8
+
+# An array chunk larger than this turns into a bitmap. A bitmap chunk smaller than half of this
+# turns back into an array (the gap avoids flip-flopping on alternating adds and removes).
+_MAX_ARRAY_SIZE = 4096
+
+# Bulk changes to a chunk are made one row id at a time when there are only this many.
+_MIN_BULK_SIZE = 8
+
+# For each byte value, the positions of the bits set in it.
+_BYTE_BITS = [tuple(i for i in range(8) if b & (1 << i)) for b in range(256)]
+
+
+class _Bitmap(object):
+  """
+  A chunk of a RowIdSet stored as a bitmap of low bits, with a count of bits set.
+  """
+  __slots__ = ('bits', 'count')
+
+  def __init__(self, low_values):
+    self.bits = bytearray(_BITMAP_BYTES)
+    self.count = 0
+    self.update(low_values)
+
+  def __len__(self):
+    return self.count
+
+  def __contains__(self, low):
+    return bool(self.bits[low >> 3] & (1 << (low & 7)))
+
+  def add(self, low):
+    """Sets the bit for low, and returns whether it was previously unset."""
+    byte, mask = low >> 3, 1 << (low & 7)
+    if self.bits[byte] & mask:
+      return False
+    self.bits[byte] |= mask
+    self.count += 1
+    return True
+
+  def discard(self, low):
+    """Clears the bit for low, and returns whether it was previously set."""
+    byte, mask = low >> 3, 1 << (low & 7)
+    if not self.bits[byte] & mask:
+      return False
+    self.bits[byte] &= ~mask
+    self.count -= 1
+    return True
+
+  def update(self, low_values):
+    """Sets the bits for all of low_values, and returns how many were previously unset."""
+    bits = self.bits
+    added = 0
+    for low in low_values:
+      byte, mask = low >> 3, 1 << (low & 7)
+      if not bits[byte] & mask:
+        bits[byte] |= mask
+        added += 1
+    self.count += added
+    return added
+
+  def difference_update(self, low_values):
+    """Clears the bits for all of low_values, and returns how many were previously set."""
+    bits = self.bits
+    removed = 0
+    for low in low_values:
+      byte, mask = low >> 3, 1 << (low & 7)
+      if bits[byte] & mask:
+        bits[byte] &= ~mask
+        removed += 1
+    self.count -= removed
+    return removed
+
+  def update_run(self, start, stop):
+    """Like update(range(start, stop)), but sets whole bytes at once."""
+    first, last = (start + 7) >> 3, stop >> 3     # Bytes entirely within the run.
+    if first >= last:
+      return self.update(range(start, stop))
+    added = (last - first) * 8 - _count_bits(self.bits[first:last])
+    self.bits[first:last] = b'\xff' * (last - first)
+    self.count += added
+    return added + self.update(itertools.chain(range(start, first << 3), range(last << 3, stop)))
+
+  def difference_update_run(self, start, stop):
+    """Like difference_update(range(start, stop)), but clears whole bytes at once."""
+    first, last = (start + 7) >> 3, stop >> 3
+    if first >= last:
+      return self.difference_update(range(start, stop))
+    removed = _count_bits(self.bits[first:last])
+    self.bits[first:last] = bytes(last - first)
+    self.count -= removed
+    return removed + self.difference_update(
+      itertools.chain(range(start, first << 3), range(last << 3, stop)))
+
+  def __iter__(self):
+    for i, b in enumerate(self.bits):
+      if b:
+        base = i << 3
+        for k in _BYTE_BITS[b]:
+          yield base + k
+
+  def copy(self):
+    bitmap = _Bitmap(())
+    bitmap.bits[:] = self.bits
+    bitmap.count = self.count
+    return bitmap
+
+
+class RowIdSet(object):
+  """
+  Set of integer row ids, supporting the subset of the `set` interface needed by its users.
+  Iteration yields row ids in increasing order.
+  """
+  __slots__ = ('_chunks', '_len')
+
+  def __init__(self, row_ids=()):
+    self._chunks = {}     # Maps high bits to an array('H') of low bits, or a _Bitmap.
+    self._len = 0
+    self.update(row_ids)
+
+  def __len__(self):
+    return self._len
+
+  def __bool__(self):
+    return self._len > 0
+
+  __nonzero__ = __bool__
+
+  def __contains__(self, row_id):
+    chunk = self._chunks.get(row_id >> _CHUNK_BITS)
+    if chunk is None:
+      return False
+    low = row_id & _CHUNK_MASK
+    if type(chunk) is array:
+      i = bisect.bisect_left(chunk, low)
+      return i < len(chunk) and chunk[i] == low
+    return bool(chunk.bits[low >> 3] & (1 << (low & 7)))
+
+  def __iter__(self):
+    # Chunks are looked up as the iteration reaches them. If the set is modified meanwhile (as when
+    # a nested recompute of a node cleans some of its dirty rows), a chunk may be gone by then.
+    chunks = self._chunks
+    return itertools.chain.from_iterable(
+      map((high << _CHUNK_BITS).__add__, chunks.get(high, ())) for high in sorted(chunks))
+
+  def __repr__(self):
+    return "RowIdSet(%r)" % list(self)
+
+  def __sub__(self, row_ids):
+    result = self.copy()
+    result.difference_update(row_ids)
+    return result
+
+  def __isub__(self, row_ids):
+    self.difference_update(row_ids)
+    return self
+
+  def copy(self):
+    result = RowIdSet()
+    result._chunks = {high: chunk[:] if type(chunk) is array else chunk.copy()
+                      for (high, chunk) in self._chunks.items()}
+    result._len = self._len
+    return result
+
+  def add(self, row_id):
+    high, low = row_id >> _CHUNK_BITS, row_id & _CHUNK_MASK
+    chunk = self._chunks.get(high)
+    if chunk is None:
+      self._chunks[high] = array('H', (low,))
+    elif type(chunk) is array:
+      if len(chunk) < _MAX_ARRAY_SIZE and chunk[-1] < low:
+        chunk.append(low)     # The common case of adding row ids in increasing order.
+        self._len += 1
+        return
+      i = bisect.bisect_left(chunk, low)
+      if i < len(chunk) and chunk[i] == low:
+        return
+      if len(chunk) < _MAX_ARRAY_SIZE:
+        chunk.insert(i, low)
+      else:
+        bitmap = self._chunks[high] = _Bitmap(chunk)
+        bitmap.add(low)
+    else:
+      # Same as chunk.add(low), inlined since this is the common case for large sets.
+      bits, byte, mask = chunk.bits, low >> 3, 1 << (low & 7)
+      if bits[byte] & mask:
+        return
+      bits[byte] |= mask
+      chunk.count += 1
+    self._len += 1
+
+  def discard(self, row_id):
+    high, low = row_id >> _CHUNK_BITS, row_id & _CHUNK_MASK
+    chunk = self._chunks.get(high)
+    if chunk is None:
+      return
+    if type(chunk) is array:
+      i = bisect.bisect_left(chunk, low)
+      if i == len(chunk) or chunk[i] != low:
+        return
+      del chunk[i]
+      if not chunk:
+        del self._chunks[high]
+    elif not chunk.discard(low):
+      return
+    elif chunk.count < _MAX_ARRAY_SIZE // 2:
+      self._chunks[high] = array('H', chunk)
+    self._len -= 1
+
+  def update(self, row_ids):
+    # Changes are made a chunk at a time, which for many row ids is much faster than add().
+    chunks = self._chunks
+    for high, lows in _group_by_chunk(row_ids):
+      chunk = chunks.get(high)
+      if len(lows) <= _MIN_BULK_SIZE:
+        base = high << _CHUNK_BITS
+        for low in lows:
+          self.add(base + low)
+      elif chunk is None and type(lows) is not list:
+        # A chunk of another RowIdSet can be copied as is.
+        chunks[high] = lows[:] if type(lows) is array else lows.copy()
+        self._len += len(lows)
+      elif type(chunk) is not _Bitmap and len(lows) + len(chunk or ()) <= _MAX_ARRAY_SIZE:
+        merged = set(lows)
+        if chunk is not None:
+          merged.update(chunk)
+          self._len -= len(chunk)
+        chunks[high] = array('H', sorted(merged))
+        self._len += len(merged)
+      else:
+        if type(chunk) is not _Bitmap:
+          chunk = chunks[high] = _Bitmap(chunk or ())
+        run = _get_run(lows)
+        self._len += chunk.update_run(*run) if run else chunk.update(lows)
+
+  def difference_update(self, row_ids):
+    chunks = self._chunks
+    for high, lows in _group_by_chunk(row_ids):
+      chunk = chunks.get(high)
+      if chunk is None:
+        continue
+      if len(lows) <= _MIN_BULK_SIZE:
+        base = high << _CHUNK_BITS
+        for low in lows:
+          self.discard(base + low)
+        continue
+      self._len -= len(chunk)
+      if type(chunk) is _Bitmap:
+        run = _get_run(lows)
+        if run:
+          chunk.difference_update_run(*run)
+        else:
+          chunk.difference_update(lows)
+        if chunk.count < _MAX_ARRAY_SIZE // 2:
+          chunk = array('H', chunk)
+      else:
+        remaining = set(chunk)
+        remaining.difference_update(lows)
+        chunk = array('H', sorted(remaining))
+      self._len += len(chunk)
+      if chunk:
+        chunks[high] = chunk
+      else:
+        del chunks[high]
+
+  def clear(self):
+    self._chunks.clear()
+    self._len = 0
+
+
+def _group_by_chunk(row_ids):
+  """
+  Returns pairs (high, lows) grouping the given row ids by chunk, where lows is a sorted list of
+  the low bits of the row ids in that chunk, or for a RowIdSet, the chunk itself.
+  """
+  if type(row_ids) is RowIdSet:
+    return row_ids._chunks.items()    # pylint: disable=protected-access
+  row_ids = sorted(row_ids)
+  groups = []
+  start = 0
+  while start < len(row_ids):
+    high = row_ids[start] >> _CHUNK_BITS
+    base = high << _CHUNK_BITS
+    end = bisect.bisect_left(row_ids, base + _CHUNK_MASK + 1, start)
+    groups.append((high, [r - base for r in row_ids[start:end]]))
+    start = end
+  return groups
+
+
+def _get_run(lows):
+  """
+  Returns (start, stop) if the sorted list lows is the same as range(start, stop), else None.
+  """
+  if type(lows) is list and lows[-1] - lows[0] == len(lows) - 1:
+    run = range(lows[0], lows[-1] + 1)
+    if lows == list(run):
+      return (run.start, run.stop)
+  return None
+
+
+def _count_bits(data):
+  return bin(int.from_bytes(data, 'little')).count('1')
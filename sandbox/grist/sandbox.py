@@ -17,6 +17,9 @@ import traceback
 
 log = logging.getLogger(__name__)
 
+# Set by block_external_calls(), in forked worker processes.
+_external_calls_blocked = False
+
 class CarefulReader(object):
   """
   Wrap a pipe when reading from Pyodide, to work around marshaling
@@ -68,6 +71,8 @@ class Sandbox(object):
     self._external_input = external_input
     self._external_output = external_output
     self._external_output_method = external_output_method
+    # Maps names of functions called from JS to a pair [number of calls, bytes of results sent].
+    self._call_stats = {}
 
   @classmethod
   def connected_to_js_pipes(cls):
@@ -108,6 +113,7 @@ class Sandbox(object):
     # It's much better to ensure the whole blob is sent as one write. We marshal the resulting
     # buffer again so that the reader can quickly tell how many bytes to expect.
     buf = marshal.dumps((msgCode, msgBody), 2)
+    size = len(buf)
     if self._external_output:
       marshal.dump(buf, self._external_output, 2)
       self._external_output.flush()
@@ -116,8 +122,11 @@ class Sandbox(object):
       self._external_output_method(buf)
     else:
       raise Exception('no data output method')
+    return size
 
   def call_external(self, name, *args):
+    if _external_calls_blocked:
+      raise Exception("Can't call %r from a worker process" % name)
     self._send_to_js(Sandbox.CALL, (name,) + args)
     (msgCode, data) = self.run(break_on_response=True)
     if msgCode == Sandbox.EXC:
@@ -127,6 +136,17 @@ class Sandbox(object):
   def register(self, func_name, func):
     self._functions[func_name] = func
 
+  def get_call_stats(self, clear=True):
+    """
+    Returns a dict mapping names of functions called from JS to {"calls": N, "bytes": B}, with the
+    number of calls and the total size of their marshalled results.
+    """
+    stats = {name: {"calls": calls, "bytes": size}
+             for (name, (calls, size)) in self._call_stats.items()}
+    if clear:
+      self._call_stats.clear()
+    return stats
+
   def run(self, break_on_response=False):
     while True:
       try:
@@ -145,7 +165,10 @@ class Sandbox(object):
         fname = data[0]
         args = data[1:]
         ret = self._functions[fname](*args)
-        self._send_to_js(Sandbox.DATA, ret)
+        size = self._send_to_js(Sandbox.DATA, ret)
+        stats = self._call_stats.setdefault(fname, [0, 0])
+        stats[0] += 1
+        stats[1] += size
       except Exception as e:
         log.warn("Call error in %s: %s", fname, traceback.format_exc())
         self._send_to_js(Sandbox.EXC, "%s %s" % (type(e).__name__, e))
@@ -168,6 +191,15 @@ def get_default_sandbox():
 def call_external(name, *args):
   return get_default_sandbox().call_external(name, *args)
 
+def block_external_calls():
+  """
+  Makes any further call_external() in this process raise an exception. This is for processes
+  forked from the sandbox (see workers.py): they share its pipes to JS, and any message they sent
+  would break the protocol for the parent process.
+  """
+  global _external_calls_blocked
+  _external_calls_blocked = True
+
 def register(func_name, func):
   get_default_sandbox().register(func_name, func)
 
@@ -428,9 +428,20 @@ def cols_to_dict_list(cols):
   """Convert OrderedDict of SchemaColumns to an array of column dicts."""
   return [col_to_dict(c) for c in cols.values()]
 
-def clone_schema(schema):
-  return OrderedDict((t, SchemaTable(s.tableId, s.columns.copy()))
-                     for (t, s) in schema.items())
+def clone_schema(schema, table_ids=None):
+  """
+  Returns a copy of schema that is unaffected by changes to it. If table_ids is given, only the
+  columns of those tables are copied, and other tables are shared with the original, so they must
+  not be modified.
+  """
+  if table_ids is None:
+    return OrderedDict((t, SchemaTable(s.tableId, s.columns.copy()))
+                       for (t, s) in schema.items())
+  cloned = schema.copy()
+  for t in table_ids:
+    if t in cloned:
+      cloned[t] = SchemaTable(cloned[t].tableId, cloned[t].columns.copy())
+  return cloned
 
 def get_reverse_col_id_lookup_func(collist):
   """
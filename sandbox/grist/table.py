@@ -13,6 +13,10 @@ import usertypes
 
 log = logging.getLogger(__name__)
 
+# The number of rows from which the missing groups of a summary table get added all at once. For
+# fewer rows, as for most changes, the summary helper formula adds them one by one.
+_MIN_ROWS_TO_ADD_SUMMARY_GROUPS = 50
+
 
 def get_default_func_name(col_id):
   return "_default_" + col_id
@@ -396,36 +400,13 @@ class Table(object):
       def _updateSummary(rec, table):  # pylint: disable=unused-argument
         # Create a row in the summary table for every combination of values in
         # list type columns
-        lookup_values = []
-        for group_col in groupby_cols:
-          lookup_value = getattr(rec, group_col)
-          group_col_obj = self.all_columns[group_col]
-          if isinstance(group_col_obj, (column.ChoiceListColumn, column.ReferenceListColumn)):
-            # Check that ChoiceList/ReferenceList cells have appropriate types.
-            # Don't iterate over characters of a string.
-            if isinstance(lookup_value, (bytes, str)):
-              return []
-            try:
-              # We only care about the unique choices
-              lookup_value = set(lookup_value)
-            except TypeError:
-              return []
-
-            if not lookup_value:
-              if isinstance(group_col_obj, column.ChoiceListColumn):
-                lookup_value = {""}
-              else:
-                lookup_value = {0}
-
-          else:
-            lookup_value = [lookup_value]
-          lookup_values.append(lookup_value)
+        groups = self._get_summary_groups(groupby_cols, lambda col_id: getattr(rec, col_id))
 
         result = []
         values_to_add = {}
         new_row_ids = []
 
-        for values_tuple in sorted(itertools.product(*lookup_values)):
+        for values_tuple in groups:
           values_dict = dict(zip(groupby_cols, values_tuple))
           row_id = summary_table.lookup_one_record(**values_dict)._row_id
           if row_id:
@@ -444,6 +425,9 @@ class Table(object):
 
         return result
 
+    # The engine calls this before evaluating the formula for many rows at once.
+    _updateSummary.prepare_rows = (
+      lambda row_ids: self._add_summary_groups(summary_table, groupby_cols, row_ids))
     _updateSummary.is_private = True
     col_id = summary_table._summary_helper_col_id
     if self.has_column(col_id):
@@ -454,6 +438,87 @@ class Table(object):
     col_obj = self._create_or_update_col(col_id, _updateSummary)
     self._add_special_col(col_obj)
 
+  def _get_summary_groups(self, groupby_cols, get_value):
+    """
+    Returns the sorted list of tuples of groupby_cols values for the summary groups of a record
+    whose values are returned by get_value(col_id). A record belongs to a group for each
+    combination of the values in its list columns.
+    """
+    lookup_values = []
+    for group_col in groupby_cols:
+      lookup_value = get_value(group_col)
+      group_col_obj = self.all_columns[group_col]
+      if isinstance(group_col_obj, (column.ChoiceListColumn, column.ReferenceListColumn)):
+        # Check that ChoiceList/ReferenceList cells have appropriate types.
+        # Don't iterate over characters of a string.
+        if isinstance(lookup_value, (bytes, str)):
+          return []
+        try:
+          # We only care about the unique choices
+          lookup_value = set(lookup_value)
+        except TypeError:
+          return []
+
+        if not lookup_value:
+          if isinstance(group_col_obj, column.ChoiceListColumn):
+            lookup_value = {""}
+          else:
+            lookup_value = {0}
+
+      else:
+        lookup_value = [lookup_value]
+      lookup_values.append(lookup_value)
+
+    return sorted(itertools.product(*lookup_values))
+
+  def _add_summary_groups(self, summary_table, groupby_cols, row_ids):
+    """
+    Adds the missing rows of summary_table for the groups of all the given rows of this table, in
+    a single action. This saves the summary helper formula from adding them one at a time, which
+    is slow when e.g. a summary table gets created for a large table.
+    """
+    engine = self._engine
+    if (len(row_ids) < _MIN_ROWS_TO_ADD_SUMMARY_GROUPS or
+        engine.is_triggered_by_table_action(summary_table.table_id) or
+        not all(self.has_column(c) and summary_table.has_column(c) for c in groupby_cols)):
+      return
+    group_cols = [self.all_columns[col_id] for col_id in groupby_cols]
+    lookup_map = summary_table._get_lookup_map(groupby_cols)
+    # Groups are only known here if the group-by values are up to date, and we can only tell
+    # which groups exist if the lookup index is up to date (or trivially, if there are no rows).
+    if (any(col.node in engine.recompute_map for col in group_cols) or
+        (lookup_map.node in engine.recompute_map and summary_table.row_ids.max() > 0)):
+      return
+
+    summary_cols = [summary_table.get_column(col_id) for col_id in groupby_cols]
+    missing = {}
+    for row_id in row_ids:
+      if row_id not in self.row_ids:
+        continue
+      try:
+        if summary_table._summary_simple:
+          groups = [tuple(col.get_cell_value(row_id) for col in group_cols)]
+        else:
+          groups = self._get_summary_groups(
+            groupby_cols, lambda col_id: self.all_columns[col_id].get_cell_value(row_id))
+      except Exception:
+        # Leave errors to the summary helper formula.
+        continue
+      for values in groups:
+        # Convert values as lookups do, to get the key under which the lookup index has them.
+        key = tuple(lookup._extract(col._convert_raw_value(col.convert(value)))
+                    for col, value in zip(summary_cols, values))
+        if key not in missing and not lookup_map._do_fast_lookup(key):
+          missing[key] = values
+
+    if missing:
+      # summary table output should be treated as we treat formula columns, for acl purposes
+      with engine.user_actions.indirect_actions():
+        engine.user_actions.BulkAddRecord(summary_table.table_id, [None] * len(missing), {
+          col_id: [values[i] for values in missing.values()]
+          for i, col_id in enumerate(groupby_cols)
+        })
+
   def get_helper_columns(self):
     """
     Returns a list of columns from other tables that are only needed for the sake of this table.
@@ -697,6 +762,12 @@ class Table(object):
     if not row_ids and isinstance(col_obj, column.BaseReferenceColumn):
       return col_obj._target_table.RecordSet([], None)
 
+    # Numbers don't need per-cell conversion, so fetch them in bulk when there is no alttext or
+    # errors among them. This is common for aggregates in summary tables, like SUM($group.Amount).
+    plain_numbers = col_obj.get_plain_numbers(row_ids)
+    if plain_numbers is not None:
+      return plain_numbers
+
     values = [col_obj.get_cell_value(row_id) for row_id in row_ids]
 
     # When all the values are the same type of Record (i.e. all references to the same table)
@@ -732,14 +803,20 @@ class Table(object):
 
   def _add_field_to_record_classes(self, col_obj):
     node = col_obj.node
-    use_node = self._engine._use_node
+    engine = self._engine
+    use_node = engine._use_node
+    use_node_for_iteration = engine._use_node_for_iteration
 
     @property
     def record_field(rec):
       # This is equivalent to _get_col_obj_value(), but is extra-optimized with _get_col_obj_value()
       # and adjust_record() inlined, since this is particularly hot code, called on every access of
       # any data field in a formula.
-      use_node(node, rec._source_relation, (rec._row_id,))
+      iteration = rec._iteration
+      if iteration is None:
+        use_node(node, rec._source_relation, (rec._row_id,))
+      else:
+        use_node_for_iteration(node, rec._source_relation, iteration, rec._row_id)
       value = col_obj.get_cell_value(rec._row_id)
       if isinstance(value, (BaseRecord, BaseRecordSet)):
         return value._clone_with_relation(rec._source_relation)
@@ -1,3 +1,4 @@
+import itertools
 import logging
 
 import actions
@@ -26,6 +27,11 @@ class TableDataSet(object):
     # Add/ModifyColumn actions.
     self._schema = {}
 
+    # Dictionary of { tableId: { rowId: index }}, mapping row ids to their index in the table's
+    # lists. Built when first needed, kept up to date as records are added, and dropped when
+    # records are removed.
+    self._row_maps = {}
+
   def apply_doc_action(self, action):
     try:
       getattr(self, action.__class__.__name__)(*action)
@@ -44,6 +50,13 @@ class TableDataSet(object):
   def get_schema(self):
     return self._schema
 
+  def _get_row_map(self, table_id):
+    row_map = self._row_maps.get(table_id)
+    if row_map is None:
+      row_ids = self.all_tables[table_id].row_ids
+      row_map = self._row_maps[table_id] = dict(zip(row_ids, range(len(row_ids))))
+    return row_map
+
   #----------------------------------------
   # Actions on records.
   #----------------------------------------
@@ -52,6 +65,10 @@ class TableDataSet(object):
 
   def BulkAddRecord(self, table_id, row_ids, columns):
     table_data = self.all_tables[table_id]
+    row_map = self._row_maps.get(table_id)
+    if row_map is not None:
+      start = len(table_data.row_ids)
+      row_map.update(zip(row_ids, range(start, start + len(row_ids))))
     table_data.row_ids.extend(row_ids)
     for col, values in table_data.columns.items():
       if col in columns:
@@ -66,10 +83,17 @@ class TableDataSet(object):
 
   def BulkRemoveRecord(self, table_id, row_ids):
     table_data = self.all_tables[table_id]
-    remove_set = set(row_ids)
-    for col, values in table_data.columns.items():
-      values[:] = [v for r, v in zip(table_data.row_ids, values) if r not in remove_set]
-    table_data.row_ids[:] = [r for r in table_data.row_ids if r not in remove_set]
+    row_map = self._get_row_map(table_id)
+    keep = bytearray(b'\x01') * len(table_data.row_ids)
+    for r in row_ids:
+      index = row_map.get(r)
+      if index is not None:
+        keep[index] = 0
+    for values in table_data.columns.values():
+      values[:] = itertools.compress(values, keep)
+    table_data.row_ids[:] = itertools.compress(table_data.row_ids, keep)
+    # Indices of the remaining records have changed.
+    del self._row_maps[table_id]
 
   def UpdateRecord(self, table_id, row_id, columns):
     self.BulkUpdateRecord(
@@ -77,8 +101,8 @@ class TableDataSet(object):
 
   def BulkUpdateRecord(self, table_id, row_ids, columns):
     table_data = self.all_tables[table_id]
-    rowid_map = {r:i for i, r in enumerate(table_data.row_ids)}
-    table_indices = [rowid_map[r] for r in row_ids]
+    row_map = self._get_row_map(table_id)
+    table_indices = [row_map[r] for r in row_ids]
     for col, values in columns.items():
       if col in table_data.columns:
         col_values = table_data.columns[col]
@@ -87,6 +111,7 @@ class TableDataSet(object):
 
   def ReplaceTableData(self, table_id, row_ids, columns):
     table_data = self.all_tables[table_id]
+    self._row_maps.pop(table_id, None)
     del table_data.row_ids[:]
     for col, values in table_data.columns.items():
       del values[:]
@@ -121,13 +146,17 @@ class TableDataSet(object):
   def AddTable(self, table_id, columns):
     self.all_tables[table_id] = actions.TableData(table_id, [], {c['id']: [] for c in columns})
     self._schema[table_id] = {c['id']: c.copy() for c in columns}
+    self._row_maps.pop(table_id, None)
 
   def RemoveTable(self, table_id):
     del self.all_tables[table_id]
     del self._schema[table_id]
+    self._row_maps.pop(table_id, None)
 
   def RenameTable(self, old_table_id, new_table_id):
     table_data = self.all_tables.pop(old_table_id)
     self.all_tables[new_table_id] = actions.TableData(new_table_id, table_data.row_ids,
                                               table_data.columns)
     self._schema[new_table_id] = self._schema.pop(old_table_id)
+    if old_table_id in self._row_maps:
+      self._row_maps[new_table_id] = self._row_maps.pop(old_table_id)
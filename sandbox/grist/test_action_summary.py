@@ -0,0 +1,52 @@
+import unittest
+
+import actions
+from action_summary import ActionSummary, ColumnDelta
+import objtypes
+
+class TestActionSummary(unittest.TestCase):
+  def test_column_delta(self):
+    delta = ColumnDelta()
+    self.assertFalse(delta)
+    delta.add_changes([(3, "a", "b"), (1, 1, 1.0), (2, None, None)])
+    # A repeated change keeps the original 'before' value.
+    delta.add_changes([(3, "x", "c"), (4, 1.0, float('nan'))])
+    self.assertEqual(len(delta), 4)
+    self.assertEqual(delta.get_values([1, 3], 0), [1, "a"])
+    self.assertEqual(delta.get_values([3, 2], 1), ["c", None])
+
+    # Rows whose values are equal in encoding (1 and 1.0, None and None) aren't changed.
+    self.assertEqual(delta.get_changed_row_ids(), [3, 4])
+
+    # A change that reverts to the original value is not a change either.
+    delta.add_changes([(3, "b", "a"), (4, float('nan'), 1.0)])
+    self.assertEqual(delta.get_changed_row_ids(), [])
+
+  def test_equality_of_rich_values(self):
+    # Values that aren't of simple types are compared by their encoding.
+    delta = ColumnDelta()
+    delta.add_changes([
+      (1, True, 1),
+      (2, ["x", 1], ("x", 1)),
+      (3, objtypes.RaisedException(ValueError("a")), objtypes.RaisedException(ValueError("a"))),
+      (4, 2**70, 2**70),
+      (5, 2**70, 2**70 + 1),
+    ])
+    self.assertEqual(delta.get_changed_row_ids(), [1, 5])
+
+  def test_deltas_to_actions(self):
+    summary = ActionSummary()
+    summary.add_changes("Table1", "A", [(5, 0, 10), (2, 0, 20), (7, 1, 1)])
+    summary.add_changes("Table1", "A", [(9, 3, 30)])
+    summary.add_records("Table1", [9])
+    out_stored, out_undo = [], []
+    summary.convert_deltas_to_actions(out_stored, out_undo)
+    self.assertEqual(out_stored, [
+      actions.BulkUpdateRecord("Table1", [2, 5, 9], {"A": [20, 10, 30]}),
+    ])
+    self.assertEqual(out_undo, [
+      actions.BulkUpdateRecord("Table1", [2, 5], {"A": [0, 0]}),
+    ])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,160 @@
+import random
+import unittest
+
+import actions
+import column_storage
+from column_storage import SparseStorage, DictEncodedStorage
+import objtypes
+import test_engine
+import testutil
+
+# Values with the subtle distinctions the storage must preserve: types of equal values, the sign
+# of zero, unhashable and unencodable values.
+_SAMPLE_VALUES = ["", "a", "b", None, 0, 0.0, -0.0, False, 1, 1.0, True, ("a", "b"), ("a", 1),
+                  ["x"], {"y": 1}, float('nan'), objtypes.RaisedException(ValueError("e"))]
+
+def _same(a, b):
+  return type(a) is type(b) and repr(a) == repr(b)
+
+class TestColumnStorage(unittest.TestCase):
+  def _check_against_list(self, storage, values):
+    rand = random.Random(23)
+    for _ in range(3000):
+      row_id = rand.randrange(len(values))
+      value = rand.choice(_SAMPLE_VALUES)
+      storage[row_id] = value
+      values[row_id] = value
+    self.assertEqual(len(storage), len(values))
+    for row_id, value in enumerate(values):
+      self.assertTrue(_same(storage[row_id], value), (row_id, storage[row_id], value))
+    self.assertTrue(all(_same(a, b) for a, b in zip(storage, values)))
+    copy = storage.copy()
+    copy[0] = "changed"
+    self.assertTrue(_same(storage[0], values[0]))
+
+    with self.assertRaises(IndexError):
+      storage[len(values)]    # pylint: disable=pointless-statement
+    with self.assertRaises(IndexError):
+      storage[len(values)] = "x"
+    storage.extend(["x", None])
+    self.assertEqual(len(storage), len(values) + 2)
+    self.assertEqual(storage[len(values)], "x")
+
+  def test_sparse(self):
+    values = [""] * 500
+    self._check_against_list(SparseStorage("", values), values)
+    values = [0.0] * 500
+    self._check_against_list(SparseStorage(0.0, values), values)
+
+  def test_dict_encoded(self):
+    values = ["a", "b", None] * 100
+    self._check_against_list(DictEncodedStorage(values), values)
+
+  def test_dict_encoded_many_values(self):
+    # The array of codes gets wider as the number of distinct values grows, and codes of values no
+    # longer in use are reused.
+    storage = DictEncodedStorage(["v%d" % i for i in range(300)])
+    self.assertEqual(storage._index.typecode, 'H')
+    for i in range(300):
+      storage[i] = "w%d" % i
+    self.assertLessEqual(len(storage._values), 302)
+    self.assertEqual(list(storage), ["w%d" % i for i in range(300)])
+
+  def test_map_distinct(self):
+    storage = DictEncodedStorage(["a", "b", None, ("a", "b"), 1.5, "a", ["a"]])
+    calls = []
+    def rename(value):
+      calls.append(value)
+      if isinstance(value, str):
+        return value.upper() if value == "a" else None
+      if isinstance(value, (tuple, list)):
+        return tuple(v.upper() for v in value)
+      return None
+    self.assertEqual(storage.map_distinct(rename),
+                     ([0, 3, 5, 6], ["A", ("A", "B"), "A", ("A",)]))
+    # The function is called once for each distinct encoded value, and for each other value.
+    self.assertEqual(len(calls), 6)
+
+  def test_choose_storage(self):
+    self.assertIs(type(column_storage.choose_storage([""] * 100, "")), list)
+    self.assertIs(type(column_storage.choose_storage([""] * 2000 + ["a"], "")), SparseStorage)
+    self.assertIs(type(column_storage.choose_storage(["a", "b"] * 1000, "")), DictEncodedStorage)
+    self.assertIs(type(column_storage.choose_storage([str(i) for i in range(2000)], "")), list)
+    self.assertIs(type(column_storage.choose_storage([["a"], ["b"]] * 1000, "")), list)
+    # Floats aren't encodable, so repetitive Numeric columns stay as lists, unless floats are rare.
+    self.assertIs(type(column_storage.choose_storage([0.5, 1.5] * 1000, 0.0)), list)
+    self.assertIs(type(column_storage.choose_storage(["a", "b"] * 1000 + [0.5] * 100, "")),
+                  DictEncodedStorage)
+
+
+class TestColumnStorageInEngine(test_engine.EngineTestCase):
+  def test_loaded_table(self):
+    # Columns of a loaded table switch to compact storage, and behave as before.
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Deals", [
+          [1, "Notes",    "Text",     False],
+          [2, "Stage",    "Choice",   False],
+          [3, "Amount",   "Numeric",  False],
+        ]],
+      ],
+      "DATA": {"Deals": [["id", "Notes", "Stage", "Amount"], [1, "", "New", 0]]}
+    }))
+    row_ids = list(range(1, 2001))
+    self.engine.load_table(actions.TableData("Deals", row_ids, {
+      "Notes": ["note" if r % 100 == 0 else "" for r in row_ids],
+      "Stage": [["New", "Won", "Lost"][r % 3] for r in row_ids],
+      "Amount": [float(r) for r in row_ids],
+    }))
+    table = self.engine.tables["Deals"]
+    self.assertIsInstance(table.get_column("Notes")._data, SparseStorage)
+    self.assertIsInstance(table.get_column("Stage")._data, DictEncodedStorage)
+    self.assertIs(type(table.get_column("Amount")._data), list)
+
+    self.add_column("Deals", "Summary", formula="$Notes + ':' + $Stage")
+    self.update_records("Deals", ["id", "Notes", "Stage"], [[100, "", "Won"], [2, "x", 5]])
+    self.add_record("Deals", Notes="new", Stage="Open")
+    self.assertEqual(self.engine.fetch_table("Deals", query={"id": [1, 2, 100, 200, 2001]}),
+      actions.TableData("Deals", [1, 2, 100, 200, 2001], {
+        "Notes": ["", "x", "", "note", "new"],
+        "Stage": ["Won", "5", "Won", "Lost", "Open"],
+        "Amount": [1.0, 2.0, 100.0, 200.0, 0.0],
+        "Summary": [":Won", "x:5", ":Won", "note:Lost", "new:Open"],
+      }))
+
+  def test_filled_sparse_column(self):
+    # A column loaded as sparse switches back to a list once enough of its values are filled in,
+    # whether by updates, added records or formulas.
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Deals", [
+          [1, "Notes",    "Text",     False],
+          [2, "Label",    "Any",      True,   "'L' if $id % 2 else None"],
+        ]],
+      ],
+      "DATA": {"Deals": [["id", "Notes"], [1, ""]]}
+    }))
+    row_ids = list(range(1, 2001))
+    self.engine.load_table(actions.TableData("Deals", row_ids, {
+      "Notes": ["note" if r % 100 == 0 else "" for r in row_ids],
+      "Label": [None] * 2000,
+    }))
+    notes = self.engine.tables["Deals"].get_column("Notes")
+    label = self.engine.tables["Deals"].get_column("Label")
+    self.assertIsInstance(notes._data, SparseStorage)
+    self.assertIsInstance(label._data, SparseStorage)
+
+    self.update_records("Deals", ["id", "Notes"], [[r, "x"] for r in range(1, 101)])
+    self.assertIsInstance(notes._data, SparseStorage)
+    self.update_records("Deals", ["id", "Notes"], [[r, "x"] for r in range(101, 301)])
+    self.assertIs(type(notes._data), list)
+    self.assertEqual(notes.raw_get_many([1, 300, 301, 400]), ["x", "x", "", "note"])
+
+    # Formula values are filled in when the formula is recomputed for all rows.
+    self.engine.invalidate_column(label)
+    self.apply_user_action(["Calculate"])
+    self.assertIs(type(label._data), list)
+    self.assertEqual(label.raw_get_many([1, 2, 3]), ["L", None, "L"])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,75 @@
+import gc
+import io
+import marshal
+import unittest
+
+import counters
+from sandbox import Sandbox
+import test_engine
+import testutil
+
+
+class TestCounters(test_engine.EngineTestCase):
+  def test_engine_counters(self):
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "People", [
+          [1, "Name",     "Text",   False],
+          [2, "Friend",   "Ref:People", False],
+        ]],
+      ],
+      "DATA": {
+        "People": [["id", "Name", "Friend"], [1, "Ann", 2], [2, "Bob", 3], [3, "Cid", 0]],
+      }
+    }))
+    self.engine.counters.get()
+
+    # The formula of B depends on C, which gets added later, so B is evaluated before C is ready.
+    self.add_column("People", "B", formula="$Name + ($Friend.B or $C)")
+    self.add_column("People", "C", formula="$Name.upper()")
+    self.add_column("People", "N", formula="len(People.lookupRecords(Friend=$id))")
+    result = self.engine.counters.get()
+    self.assertEqual(result["rebuild_usercode_count"], 3)
+    self.assertGreater(result["rebuild_usercode_seconds"], 0)
+    self.assertGreater(result["order_errors"], 0)
+    self.assertGreater(result["invalidated_nodes"], 0)
+    self.assertGreater(result["lookup_map_updates"], 0)
+    self.assertEqual(result["top_recomputed_columns"][0],
+                     {"tableId": "People", "colId": "B", "count": 6})
+    # The total includes metadata columns.
+    self.assertGreaterEqual(result["cells_recomputed"],
+                            sum(c["count"] for c in result["top_recomputed_columns"]))
+
+    # Counters get reset when retrieved.
+    self.update_record("People", 3, Name="Cy")
+    result = self.engine.counters.get()
+    self.assertNotIn("rebuild_usercode_count", result)
+    self.assertEqual({(c["colId"], c["count"]) for c in result["top_recomputed_columns"]},
+                     {("B", 3), ("C", 1)})
+
+  def test_gc(self):
+    engine_counters = counters.Counters()
+    engine_counters.track_gc()
+    try:
+      gc.collect()
+    finally:
+      engine_counters.untrack_gc()
+    gc.collect()
+    result = engine_counters.get()
+    self.assertEqual(result["gc_collections"], 1)
+    self.assertGreaterEqual(result["gc_pause_seconds"], 0)
+
+  def test_sandbox_call_stats(self):
+    calls = io.BytesIO(b"".join(marshal.dumps(v, 2) for v in [
+      Sandbox.CALL, ["echo", "x" * 100], Sandbox.CALL, ["echo", "y"]]))
+    sent = []
+    sandbox = Sandbox(calls, None, sent.append)
+    sandbox.register("echo", lambda value: value)
+    sandbox.run()
+    self.assertEqual(sandbox.get_call_stats(), {
+      "echo": {"calls": 2, "bytes": sum(len(marshal.loads(buf)) for buf in sent)}})
+    self.assertEqual(sandbox.get_call_stats(), {})
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -5,6 +5,7 @@ import datetime
 import testutil
 import test_engine
 import moment
+import timing
 
 def D(year, month, day):
   return moment.date_to_ts(datetime.date(year, month, day))
@@ -45,3 +46,38 @@ class TestDateTypes(test_engine.EngineTestCase):
       [   5,  None,         None,         "NoneType",     "NoneType"],
       [   6,  "n/a",        "unknown",    "AltText",      "AltText"],
     ])
+
+  def test_rich_value_cache_stats(self):
+    # Rich values of Date columns are cached, and hits and misses are reported in timing stats.
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Test", [
+          [1, "DateCol",    "Date",   False],
+          [2, "Year",       "Any",    True, "$DateCol.year"],
+        ]]
+      ],
+      "DATA": {
+        "Test": [
+          ["id",  "DateCol"],
+          [   1,  D(2025, 12, 6)],
+          [   2,  D(2025, 12, 6)],
+          [   3,  D(2024, 1, 1)],
+        ]
+      }
+    }))
+    self.engine.record_rich_value_cache_stats()
+    self.engine._timing = timing.Timing()
+
+    self.apply_user_action(["UpdateRecord", "Test", 1, {"DateCol": D(2024, 1, 1)}])
+    self.assertTableData('Test', cols="subset", data=[
+      ["id",  "Year"],
+      [   1,  2024],
+      [   2,  2025],
+      [   3,  2024],
+    ])
+    self.engine.record_rich_value_cache_stats()
+    stats = self.engine._timing.get()
+    self.assertEqual([s for s in stats if s["colId"] == "DateCol"], [
+      {"tableId": "Test", "colId": "DateCol", "sum": 0, "count": 0, "average": 0, "max": 0,
+       "cacheHits": 1, "cacheMisses": 0},
+    ])
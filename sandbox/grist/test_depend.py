@@ -1,3 +1,6 @@
+import unittest
+
+import depend
 import testutil
 import test_engine
 
@@ -42,3 +45,19 @@ class TestDependencies(test_engine.EngineTestCase):
       [3,    3,       16],
       [3200, 3200,    5121610],
     ])
+
+
+class TestRecomputeMap(unittest.TestCase):
+  def test_mlookup_nodes(self):
+    # The map keeps track of which of its nodes are lookups on metadata tables.
+    recompute_map = depend.RecomputeMap()
+    mlookup = depend.Node('_grist_Tables_column', '#lookup#parentId')
+    recompute_map[depend.Node('Table1', '#lookup#A')] = depend.ALL_ROWS
+    recompute_map[depend.Node('_grist_Tables', 'columns')] = depend.ALL_ROWS
+    recompute_map.setdefault(mlookup, set()).add(1)
+    self.assertEqual(recompute_map.mlookup_nodes, {mlookup})
+    self.assertEqual(recompute_map.pop(mlookup), {1})
+    self.assertEqual(recompute_map.mlookup_nodes, set())
+    recompute_map[mlookup] = depend.ALL_ROWS
+    recompute_map.clear()
+    self.assertEqual(recompute_map.mlookup_nodes, set())
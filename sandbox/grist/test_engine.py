@@ -594,6 +594,43 @@ class TestEngine(EngineTestCase):
       self.add_column('Address', 'bad', isFormula=False, type="BAD")
     self.engine.assert_schema_consistent()
 
+  def test_schema_check_scope(self):
+    # After a schema change, only the changed tables are checked for consistency with metadata,
+    # unless full_schema_check is set.
+    self.load_sample(testutil.parse_test_sample(self.sample1))
+    self.apply_user_action(["AddTable", "Other", [{"id": "A"}]])
+    schema_table = self.engine.schema["Address"]
+    schema_table.columns["city"] = schema_table.columns["city"]._replace(type="Int")
+
+    self.add_column("Other", "B")
+    with self.assertRaisesRegex(AssertionError, r"Internal schema different"):
+      self.add_column("Address", "B")
+
+    self.engine.full_schema_check = True
+    with self.assertRaisesRegex(AssertionError, r"Internal schema different"):
+      self.add_column("Other", "C")
+
+  def test_nested_recompute_across_chunks(self):
+    # Dirty rows are kept in a RowIdSet, in chunks of 65536 row ids. When computing a row causes
+    # a nested recompute of the same column, rows in a later chunk may all get cleaned, and the
+    # outer loop over dirty rows must cope with the chunk being gone.
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "T", [
+          [1, "A", "Numeric", False, "", "", ""],
+        ]]
+      ],
+      "DATA": {
+        "T": [["id", "A"], [1, 1]] + [[r, r] for r in range(65536, 65541)],
+      }
+    }))
+    self.add_column("T", "F", formula=
+                    "$A if $id > 1 else sum(T.lookupOne(id=r).F for r in range(65536, 65541))")
+    self.assertTableData("T", cols="subset", data=[
+      ["id", "F"],
+      [1, sum(range(65536, 65541))],
+    ] + [[r, r] for r in range(65536, 65541)])
+
 
 def create_tests_from_script(samples, test_cases):
   """
@@ -82,3 +82,10 @@ class TestChain(unittest.TestCase):
   def test_chain_type_error(self):
     with self.assertRaises(TypeError):
       functions.SUM(x / "2" for x in [1, 2, 3])
+
+  def test_average_paths(self):
+    # A plain list of numbers takes a fast path, which must add them up the same way as the
+    # general one. (Builtin sum() would differ from it on some Python versions.)
+    values = [0.1] * 10 + [1e16, 1.0, -1e16]
+    self.assertEqual(functions.AVERAGE(values), functions.AVERAGE(*values))
+    self.assertEqual(functions.AVERAGE(values), 0.0)
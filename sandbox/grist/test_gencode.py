@@ -305,6 +305,36 @@ class TestGenCode(unittest.TestCase):
       (('Address', 'testcol'), 24, 'Students', None),
     ] + expected_names[1:])
 
+  def test_grist_names_filtered(self):
+    # Verifies that grist_names() limited to some names only includes formulas that mention them,
+    # and finds in them the same names as a full parse.
+    gcode = gencode.GenCode()
+    gcode.make_module(self.schema)
+    all_names = gcode.grist_names()
+
+    def expected(names):
+      formulas = {f for (f, _, table_id, col_id) in all_names if (col_id or table_id) in names}
+      return [n for n in all_names if n[0] in formulas]
+
+    for names in [{'school'}, {'Schools'}, {'country', 'fullName'}, {'region'}]:
+      self.assertEqual(gcode.grist_names(names), expected(names))
+
+    # Names not mentioned in any formula skip parsing altogether.
+    self.assertEqual(gcode.grist_names({'unknownCol'}), [])
+    self.assertEqual(gcode.grist_names(set()), [])
+
+    # Index gets updated when formulas change.
+    self.schema['Address'].columns['testcol'] = schema.SchemaColumn(
+      'testcol', 'Any', True, 'Students.lookupOne(school=$id).fullName', None)
+    gcode.make_module(self.schema)
+    self.assertEqual(gcode.grist_names({'fullName'}), [
+      (('Address', 'testcol'), 31, 'Students', 'fullName'),
+      (('Address', 'testcol'), 0, 'Students', None),
+      (('Address', 'testcol'), 19, 'Students', 'school'),
+      (('Address', 'testcol'), 27, 'Address', 'id'),
+      (('Students', 'fullNameLen'), 8, 'Students', 'fullName'),
+    ])
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -529,6 +529,81 @@ return ",".join(str(r.id) for r in Students.lookupRecords(firstName=fn, lastName
                 "Schools": {'#lookup#name': 1, '#lookup#cname': 1, "cname": 1} },
     })
 
+  def test_iterated_record_dependencies(self):
+    """
+    Fields of records produced by iterating a RecordSet create a dependency once for the whole
+    RecordSet. Check that it's still correct, including when some accesses are PEEK()-ed.
+    """
+    self.load_sample(testsamples.sample_students)
+    self.add_column("Schools", "label", formula="$name[:3] + str($id)")
+    self.add_column("Students", "labels", formula=
+                    "':'.join(r.label for r in Schools.lookupRecords(name=$schoolName))")
+    self.add_column("Students", "peeked", formula=
+                    "':'.join(PEEK(r.label) for r in Schools.lookupRecords(name=$schoolName))")
+    self.add_column("Students", "mixed", formula=
+                    "':'.join(PEEK(r.label) + r.label "
+                    "for r in Schools.lookupRecords(name=$schoolName))")
+
+    self.assertPartialData("Students", ["id", "labels", "peeked", "mixed"], [
+      [1,   "Col1:Col2",  "Col1:Col2",  "Col1Col1:Col2Col2"],
+      [2,   "Yal3:Yal4",  "Yal3:Yal4",  "Yal3Yal3:Yal4Yal4"],
+      [3,   "Col1:Col2",  "Col1:Col2",  "Col1Col1:Col2Col2"],
+      [4,   "Yal3:Yal4",  "Yal3:Yal4",  "Yal3Yal3:Yal4Yal4"],
+      [5,   "",           "",           ""],
+      [6,   "Yal3:Yal4",  "Yal3:Yal4",  "Yal3Yal3:Yal4Yal4"],
+    ])
+
+    # A change to the labels affects the formulas that depend on them, including via records
+    # after the first one, but not the formula that only peeks at them.
+    out_actions = self.modify_column("Schools", "label", formula="$name[0] + str($id)")
+    self.assertPartialData("Students", ["id", "labels", "peeked", "mixed"], [
+      [1,   "C1:C2",      "Col1:Col2",  "C1C1:C2C2"],
+      [2,   "Y3:Y4",      "Yal3:Yal4",  "Y3Y3:Y4Y4"],
+      [3,   "C1:C2",      "Col1:Col2",  "C1C1:C2C2"],
+      [4,   "Y3:Y4",      "Yal3:Yal4",  "Y3Y3:Y4Y4"],
+      [5,   "",           "",           ""],
+      [6,   "Y3:Y4",      "Yal3:Yal4",  "Y3Y3:Y4Y4"],
+    ])
+    self.assertEqual(out_actions.calls.get("Students"), {"labels": 6, "mixed": 6})
+
+  def test_iterated_record_self_reference(self):
+    # A running balance iterates over all records, including the current one, but only reads the
+    # formula column for earlier ones. That must not be treated as a circular reference.
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Ledger", [
+          [1, "Amt", "Numeric", False, "", "", ""],
+          [2, "Bal", "Numeric", True,
+           "$Amt + sum(r.Bal for r in Ledger.lookupRecords() if r.id == $id - 1)", "", ""],
+        ]]
+      ],
+      "DATA": {
+        "Ledger": [
+          ["id", "Amt"],
+          [1,    1],
+          [2,    2],
+          [3,    3],
+          [4,    4],
+        ]
+      }
+    }))
+    self.assertTableData("Ledger", cols="subset", data=[
+      ["id", "Amt", "Bal"],
+      [1,    1,     1],
+      [2,    2,     3],
+      [3,    3,     6],
+      [4,    4,     10],
+    ])
+
+    self.update_record("Ledger", 2, Amt=5)
+    self.assertTableData("Ledger", cols="subset", data=[
+      ["id", "Amt", "Bal"],
+      [1,    1,     1],
+      [2,    5,     6],
+      [3,    3,     9],
+      [4,    4,     13],
+    ])
+
   def use_saved_lookup_results(self):
     """
     This sets up data so that lookupRecord results are stored in a column and used in another. Key
@@ -66,6 +66,32 @@ class TestMigrations(unittest.TestCase):
       self.fail("Migrations are incomplete. Suggested migration to add:\n" +
                 suggested_schema_update + suggested_migration)
 
+  def test_fetch_needed_tables(self):
+    # Only the data of user tables needed by migrations gets fetched.
+    tdset = table_data_set.TableDataSet()
+    tdset.apply_doc_actions(schema_version0())
+    tdset.apply_doc_actions([
+      actions.BulkAddRecord("_grist_Tables", [1, 2], {"tableId": ["People", "Other"]}),
+      actions.BulkAddRecord("_grist_Tables_column", [1, 2], {
+        "parentId": [1, 2], "parentPos": [1, 1], "colId": ["Photo", "Name"],
+        "type": ["Image", "Text"], "widgetOptions": ["", ""], "isFormula": [False, False],
+        "formula": ["", ""], "label": ["Photo", "Name"],
+      }),
+    ])
+    metadata = {t: data for t, data in tdset.all_tables.items() if t.startswith('_grist_')}
+    with self.assertRaisesRegex(Exception, "need all tables for migration to 17"):
+      migrations.create_migrations(metadata, metadata_only=True)
+
+    fetched = []
+    def fetch_table(table_id):
+      fetched.append(table_id)
+      return actions.TableData(table_id, [1, 2], {"Photo": [5, 0]})
+    migration_actions = migrations.create_migrations(metadata, True, fetch_table)
+    self.assertEqual(fetched, ["People"])
+    self.assertIn(actions.BulkUpdateRecord("People", [1, 2], {"Photo": [[5], []]}),
+                  migration_actions)
+
+
 def stringify(doc_action):
   if isinstance(doc_action, actions.AddColumn):
     return '    add_column(%r, %s)' % (doc_action.table_id, col_info_args(doc_action.col_info))
@@ -110,6 +110,16 @@ class TestMoment(unittest.TestCase):
       self.assertEqual(dt.tzname(), abbr)
       self.assertEqual(dt.utcoffset(), timedelta(minutes=-offset))
 
+  def test_zone_records(self):
+    # Individually decoded zones match the full data, in the same order.
+    raw_data = moment.read_tz_raw_data()
+    self.assertEqual([z[0] for z in raw_data], moment.get_zone_names())
+    self.assertIn("America/New_York", moment.get_zone_names())
+    record = moment.get_zone_record("America/New_York")
+    self.assertEqual(tuple(record), next(z for z in raw_data if z[0] == "America/New_York"))
+    with self.assertRaises(KeyError):
+      moment.get_zone_record("Nowhere/Special")
+
   def test_ts_to_dt(self):
     # Verify that ts_to_dt works as expected.
     value_sec = 1426291200      # 2015-03-14 00:00:00 in UTC
@@ -87,6 +87,31 @@ class TestRecordList(test_engine.EngineTestCase):
       [2, "Reptilia", [2, 4],     [2, 4],   True],
     ])
 
+  def test_iteration(self):
+    # Records produced by iterating over a RecordSet may be kept around, by the formula or by
+    # builtins such as zip() and max(); each one should stay attached to its own row.
+    self.load_sample(self.sample)
+    self.add_record('Creatures', Name="Bat", Class=1)
+    self.add_record('Creatures', Name="Whale", Class=1)
+    self.add_column('Class', 'Lookup', type='RefList:Creatures', isFormula=True,
+        formula="[r for r in Creatures.lookupRecords(Class=$id)]")
+    self.add_column('Class', 'Pairs', type='Any', isFormula=True,
+        formula="[(a.Name, b.Name) for a, b in zip(Creatures.lookupRecords(Class=$id),"
+                " list(Creatures.lookupRecords(Class=$id))[1:])]")
+    self.add_column('Class', 'Longest', type='Any', isFormula=True,
+        formula="max(Creatures.lookupRecords(Class=$id), key=lambda r: len(r.Name)).Name")
+    self.add_column('Class', 'Names', type='Any', isFormula=True,
+        formula="[r.Name for r in Creatures.lookupRecords(Class=$id)]")
+
+    self.assertTableData("Class", cols="subset", data=[
+      ["id", "Lookup",     "Pairs",                                                  "Longest",
+       "Names"],
+      [1,    [1, 3, 5, 6], [("Cat", "Dolphin"), ("Dolphin", "Bat"), ("Bat", "Whale")], "Dolphin",
+       ["Cat", "Dolphin", "Bat", "Whale"]],
+      [2,    [2, 4],       [("Chicken", "Turtle")],                                  "Chicken",
+       ["Chicken", "Turtle"]],
+    ])
+
   def test_attribute_chain(self):
     self.load_sample(self.sample)
     self.add_column('Class', 'Names', type='Any', isFormula=True,
@@ -45,3 +45,45 @@ class TestReplaceTableData(test_engine.EngineTestCase):
       [ 1,    "shot",     1.5   ],
       [ 2,    "bucket",   640   ],
     ])
+
+  @test_engine.test_undo
+  def test_sync_table_data(self):
+    # SyncTableData should only produce actions (and formula recalculations) for actual changes.
+    self.apply_user_action(["AddTable", "Vessels", [
+      {"id": "Type", "type": "Text"},
+      {"id": "Size", "type": "Numeric"},
+      {"id": "Note", "type": "Text"},
+      {"id": "Label", "type": "Any", "isFormula": True, "formula": "$Type + ':' + str($Size)"},
+    ]])
+    self.apply_user_action(["BulkAddRecord", "Vessels", [1, 2, 3],
+      {"Type": ["cup", "pot", "pan"], "Size": [8, 64, 32], "Note": ["a", "b", "c"]}])
+
+    # Row 1 is unchanged, row 2 changes Size, row 3 is removed, and row 4 and a None row are new.
+    # Values are converted before comparison, so "8" matches the existing 8.0.
+    out_actions = self.apply_user_action(["SyncTableData", "Vessels", [1, 2, 4, None],
+      {"Type": ["cup", "pot", "jug", "vat"], "Size": ["8", 65, 16, 1000]}])
+    self.assertPartialOutActions(out_actions, {
+      "stored": [
+        ["RemoveRecord", "Vessels", 3],
+        ["UpdateRecord", "Vessels", 2, {"Size": 65.0}],
+        ["BulkAddRecord", "Vessels", [4, 5], {
+          "Type": ["jug", "vat"], "Size": [16.0, 1000.0], "manualSort": [3.0, 4.0]}],
+        ["BulkUpdateRecord", "Vessels", [2, 4, 5],
+          {"Label": ["pot:65.0", "jug:16.0", "vat:1000.0"]}],
+      ],
+      "calls": {"Vessels": {"#lookup#": 2, "Label": 3}},
+    })
+
+    # Omitted columns keep their values in existing rows.
+    self.assertTableData("Vessels", cols="subset", data=[
+      ["id", "Type", "Size", "Note", "Label"],
+      [1,    "cup",  8,      "a",    "cup:8.0"],
+      [2,    "pot",  65,     "b",    "pot:65.0"],
+      [4,    "jug",  16,     "",     "jug:16.0"],
+      [5,    "vat",  1000,   "",     "vat:1000.0"],
+    ])
+
+    # Syncing the same data again is a no-op.
+    out_actions = self.apply_user_action(["SyncTableData", "Vessels", [1, 2, 4, 5],
+      {"Type": ["cup", "pot", "jug", "vat"], "Size": [8, 65, 16, 1000]}])
+    self.assertPartialOutActions(out_actions, {"stored": [], "calls": {}})
@@ -1,6 +1,9 @@
 # coding=utf-8
+import time
 import unittest
+from unittest import mock
 
+import engine
 import test_engine
 import testutil
 from functions import CaseInsensitiveDict, Response, HTTPError
@@ -183,3 +186,90 @@ r.__dict__
       [1, response],
       [2, response],
     ])
+
+  def test_request_reuse(self):
+    # Requests already in flight aren't made again, and responses are reused until they expire.
+    self.load_sample(self.sample)
+    out_actions = self.modify_column("Table1", "Request", formula="REQUEST('my_url').text")
+    [key] = out_actions.requests
+    self.assertEqual(out_actions.requests[key]["deps"], {'Table1': {'Request': [1, 2]}})
+
+    # A new cell with the same request waits for the response to the request in flight.
+    out_actions = self.add_record("Table1")
+    self.assertEqual(out_actions.requests, {})
+
+    response = {'status': 200, 'statusText': 'OK', 'content': b'body', 'headers': {},
+                'deps': {'Table1': {'Request': [1, 2]}}}
+    self.apply_user_action(["RespondToRequests", {key: response.copy()}, []])
+    self.assertTableData("Table1", cols="subset", data=[
+      ["id", "Request"],
+      [1, "body"],
+      [2, "body"],
+      [3, "body"],
+    ])
+
+    # The response gets reused by new cells.
+    out_actions = self.add_record("Table1")
+    self.assertEqual(out_actions.requests, {})
+    self.assertEqual(self.engine.fetch_table("Table1").columns["Request"], ["body"] * 4)
+
+    # Once it expires, the request is made again, while cells keep the expired response.
+    with mock.patch('time.time', return_value=time.time() + engine.REQUEST_TTL):
+      out_actions = self.apply_user_action(["UpdateCurrentTime"])
+    self.assertEqual(list(out_actions.requests), [key])
+    self.assertEqual(out_actions.requests[key]["deps"], {'Table1': {'Request': [1, 2, 3, 4]}})
+    self.assertEqual(self.engine.fetch_table("Table1").columns["Request"], ["body"] * 4)
+
+  def test_request_ttl(self):
+    # A ttl of 0 or less is an error, rather than silently replaced by the default.
+    self.load_sample(self.sample)
+    self.modify_column("Table1", "Request", formula="REQUEST('my_url', ttl=$id - 2).text")
+    for value in self.engine.fetch_table("Table1").columns["Request"]:
+      self.assertIsInstance(value.error, ValueError)
+      self.assertEqual(str(value.error), "`ttl` must be a positive number of seconds")
+
+  def test_request_timeout(self):
+    # A request made again after REQUEST_TIMEOUT still gets cells that were waiting for the
+    # earlier one reevaluated with the response.
+    self.load_sample(self.sample)
+    out_actions = self.modify_column("Table1", "Request", formula="REQUEST('my_url').text")
+    [key] = out_actions.requests
+
+    out_actions = self.add_record("Table1")
+    self.assertEqual(out_actions.requests, {})
+
+    with mock.patch('time.time', return_value=time.time() + engine.REQUEST_TIMEOUT):
+      out_actions = self.add_record("Table1")
+    self.assertEqual(out_actions.requests[key]["deps"], {'Table1': {'Request': [4]}})
+
+    response = {'status': 200, 'statusText': 'OK', 'content': b'body', 'headers': {},
+                'deps': {'Table1': {'Request': [4]}}}
+    self.apply_user_action(["RespondToRequests", {key: response}, []])
+    self.assertEqual(self.engine.fetch_table("Table1").columns["Request"], ["body"] * 4)
+
+  def test_request_cache_limits(self):
+    # Failed requests aren't reused, and the least recently used responses are dropped to keep
+    # the cache within REQUEST_CACHE_BYTES.
+    self.load_sample(self.sample)
+    formula = "REQUEST('url%s' % $id).text"
+    out_actions = self.modify_column("Table1", "Request", formula=formula)
+    key1, key2 = sorted(out_actions.requests,
+                        key=lambda k: out_actions.requests[k]["deps"]['Table1']['Request'])
+    deps1 = {'Table1': {'Request': [1]}}
+    deps2 = {'Table1': {'Request': [2]}}
+    content = b'x' * 1500
+    self.apply_user_action(["RespondToRequests", {
+      key1: {'error': 'Connection refused', 'deps': deps1},
+      key2: {'status': 200, 'statusText': 'OK', 'content': content, 'headers': {}, 'deps': deps2},
+    }, []])
+
+    with mock.patch.object(engine, 'REQUEST_CACHE_BYTES', 3000):
+      out_actions = self.modify_column("Table1", "Request", formula=formula + " + ''")
+      self.assertEqual(list(out_actions.requests), [key1])
+
+      self.apply_user_action(["RespondToRequests", {
+        key1: {'status': 200, 'statusText': 'OK', 'content': content, 'headers': {},
+               'deps': deps1},
+      }, []])
+      out_actions = self.modify_column("Table1", "Request", formula=formula)
+      self.assertEqual(list(out_actions.requests), [key2])
@@ -0,0 +1,74 @@
+import random
+import unittest
+
+from row_id_set import RowIdSet
+
+class TestRowIdSet(unittest.TestCase):
+  def test_basic(self):
+    s = RowIdSet([5, 3, 70000, 3])
+    self.assertEqual(len(s), 3)
+    self.assertEqual(list(s), [3, 5, 70000])
+    self.assertIn(70000, s)
+    self.assertNotIn(4, s)
+    s.discard(4)
+    s.discard(3)
+    s.discard(70000)
+    self.assertEqual(list(s), [5])
+    s.clear()
+    self.assertFalse(s)
+
+  def test_against_set(self):
+    # Exercise conversions between array and bitmap chunks, comparing with a plain set.
+    rand = random.Random(17)
+    s = RowIdSet()
+    expected = set()
+    # Adds fill chunks enough to become bitmaps, and removals thin them back into arrays.
+    for count, op in [(30000, 'add'), (150000, 'discard'), (30000, 'add'), (150000, 'discard')]:
+      for _ in range(count):
+        row_id = rand.randint(0, 140000)
+        getattr(s, op)(row_id)
+        getattr(expected, op)(row_id)
+      self.assertEqual(len(s), len(expected))
+      self.assertEqual(list(s), sorted(expected))
+      self.assertTrue(all(r in s for r in expected))
+
+  def test_bulk_operations(self):
+    # Bulk updates and differences, with runs of row ids, sparse ones, and other RowIdSets.
+    rand = random.Random(19)
+    s = RowIdSet()
+    expected = set()
+    for _ in range(40):
+      start = rand.randint(0, 200000)
+      row_ids = rand.choice([
+        range(start, start + rand.choice([5, 100, 5000, 70000])),
+        rand.sample(range(start, start + 20000), rand.choice([5, 3000, 10000])),
+        RowIdSet(range(start, start + 10000, 3)),
+      ])
+      if rand.random() < 0.5:
+        s.update(row_ids)
+        expected.update(row_ids)
+      else:
+        s -= row_ids
+        expected.difference_update(row_ids)
+      self.assertEqual(len(s), len(expected))
+      self.assertEqual(list(s), sorted(expected))
+
+    copy = s.copy()
+    diff = s - list(expected)[::2]
+    self.assertEqual(list(diff), sorted(expected - set(list(expected)[::2])))
+    self.assertEqual(list(s), list(copy))
+    copy.clear()
+    self.assertEqual(len(s), len(expected))
+
+  def test_modify_while_iterating(self):
+    # Emptying a later chunk during iteration skips its values rather than failing.
+    s = RowIdSet([1, 2, 70000, 70001, 140000])
+    seen = []
+    for row_id in s:
+      seen.append(row_id)
+      if row_id == 1:
+        s -= [70000, 70001]
+    self.assertEqual(seen, [1, 2, 140000])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1017,5 +1017,92 @@ class Address:
     self.assertTrue(widgetOptions(new, old))
   # pylint: enable=R0915
 
+  def test_numeric_group_values(self):
+    # Numeric values of a group are fetched in bulk when they are all numbers or None, and
+    # aggregates take a fast path for them; check that results match the general path, which is
+    # still used when there is alttext.
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Sales", [
+          [1, "Region",   "Text",     False],
+          [2, "Amount",   "Numeric",  False],
+        ]]
+      ],
+      "DATA": {
+        "Sales": [
+          ["id",  "Region", "Amount"],
+          [1,     "N",      1.5],
+          [2,     "N",      None],
+          [3,     "N",      4],
+          [4,     "S",      2],
+          [5,     "S",      "n/a"],
+        ]
+      }
+    }))
+    self.apply_user_action(["CreateViewSection", 1, 0, "record", [1], None])
+    for col_id, formula in [("Values", "$group.Amount"), ("Sum", "SUM($group.Amount)"),
+                            ("Avg", "AVERAGE($group.Amount)"), ("Max", "MAX($group.Amount)"),
+                            ("Min", "MIN($group.Amount)")]:
+      self.add_column("Sales_summary_Region", col_id, formula=formula)
+
+    self.assertTableData("Sales_summary_Region", cols="subset", data=[
+      ["id", "Region", "Values",          "Sum",  "Avg",  "Max",  "Min"],
+      [1,    "N",      [1.5, None, 4.0],  5.5,    2.75,   4.0,    1.5],
+      [2,    "S",      [2.0, "n/a"],      2.0,    2.0,    2.0,    2.0],
+    ])
+
+  def test_bulk_add_groups(self):
+    # When a summary table is created for many rows, its groups get added in a single action.
+    rows = [[i, ["N", "S", "E"][i % 3], 2010 + i % 2, ["L", "a", "b"][:i % 3 + 1], i]
+            for i in range(1, 61)]
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Sales", [
+          [1, "Region",   "Text",       False],
+          [2, "Year",     "Int",        False],
+          [3, "Tags",     "ChoiceList", False],
+          [4, "Amount",   "Numeric",    False],
+        ]]
+      ],
+      "DATA": {"Sales": [["id", "Region", "Year", "Tags", "Amount"]] + rows}
+    }))
+    out_actions = self.apply_user_action(["CreateViewSection", 1, 0, "record", [1, 2], None])
+    adds = [a for a in out_actions.stored if isinstance(a, (actions.AddRecord, actions.BulkAddRecord))
+            and a.table_id == "Sales_summary_Region_Year"]
+    self.assertEqual([(type(a).__name__, a.row_ids) for a in adds],
+                     [("BulkAddRecord", [1, 2, 3, 4, 5, 6])])
+    self.assertTableData("Sales_summary_Region_Year", cols="subset", data=[
+      ["id", "Region", "Year", "count", "Amount"],
+      [1,    "S",      2011,   10,      sum(range(1, 61, 6))],
+      [2,    "E",      2010,   10,      sum(range(2, 61, 6))],
+      [3,    "N",      2011,   10,      sum(range(3, 61, 6))],
+      [4,    "S",      2010,   10,      sum(range(4, 61, 6))],
+      [5,    "E",      2011,   10,      sum(range(5, 61, 6))],
+      [6,    "N",      2010,   10,      sum(range(6, 61, 6))],
+    ])
+
+    # List group-bys get all combinations added at once too.
+    out_actions = self.apply_user_action(["CreateViewSection", 1, 0, "record", [3], None])
+    adds = [a for a in out_actions.stored if isinstance(a, (actions.AddRecord, actions.BulkAddRecord))
+            and a.table_id == "Sales_summary_Tags"]
+    self.assertEqual([(type(a).__name__, a.row_ids) for a in adds], [("BulkAddRecord", [1, 2, 3])])
+    self.assertTableData("Sales_summary_Tags", cols="subset", data=[
+      ["id", "Tags", "count"],
+      [1,    "L",    60],
+      [2,    "a",    40],
+      [3,    "b",    20],
+    ])
+
+    # Further changes keep groups up to date one row at a time.
+    out_actions = self.update_record("Sales", 1, Region="W")
+    self.assertPartialOutActions(out_actions, {"stored": [
+      ["UpdateRecord", "Sales", 1, {"Region": "W"}],
+      ["AddRecord", "Sales_summary_Region_Year", 7, {"Region": "W", "Year": 2011}],
+      ["BulkUpdateRecord", "Sales_summary_Region_Year", [1, 7], {"Amount": [279.0, 1.0]}],
+      ["BulkUpdateRecord", "Sales_summary_Region_Year", [1, 7], {"count": [9, 1]}],
+      ["BulkUpdateRecord", "Sales_summary_Region_Year", [1, 7],
+       {"group": [["L", 7, 13, 19, 25, 31, 37, 43, 49, 55], ["L", 1]]}],
+    ]})
+
 if __name__ == "__main__":
   unittest.main()
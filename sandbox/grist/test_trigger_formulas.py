@@ -359,6 +359,32 @@ class TestTriggerFormulas(test_engine.EngineTestCase):
     self.assertEqual(out_actions.calls, {})
 
 
+  def test_trigger_dependencies_scope(self):
+    # Schema changes only rebuild the dependencies of trigger columns in the affected tables.
+    self.load_sample(self.sample)
+    self.add_record("Oceans", None, Name="Southern")
+
+    cleared = []
+    orig_clear_dependencies = self.engine.dep_graph.clear_dependencies
+    def clear_dependencies(node):
+      cleared.append(node)
+      orig_clear_dependencies(node)
+    self.engine.dep_graph.clear_dependencies = clear_dependencies
+
+    self.apply_user_action(["AddColumn", "Oceans", "Depth", {"type": "Numeric"}])
+    self.assertNotIn(("Creatures", "BossUpd"), cleared)
+    self.apply_user_action(["AddColumn", "Creatures", "Size", {"type": "Text", "isFormula": False}])
+    self.assertIn(("Creatures", "BossUpd"), cleared)
+
+    # The trigger dependencies still work.
+    out_actions = self.update_record("Creatures", 1, Ocean=1)
+    self.assertEqual(out_actions.calls, {"Creatures": {"BossUpd": 1, "BossAll": 1,
+                                                       "OceanName": 1}})
+    self.assertTableData("Creatures", cols="subset", data=[
+      ["id", "BossDef", "BossUpd",   "BossAll"],
+      [1,    "Arthur",  "Watatsumi", "Watatsumi"],
+    ])
+
   def test_changing_trigger_formula(self):
     self.load_sample(self.sample)
 
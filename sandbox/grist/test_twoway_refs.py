@@ -1278,6 +1278,60 @@ class TestTwoWayReferences(test_engine.EngineTestCase):
       [2, "Bob", EmptyList],
     ])
 
+  @test_engine.test_undo
+  def test_many_back_references(self):
+    # Reverse values are updated incrementally for small changes, and rebuilt for large ones;
+    # check that both give correct results, including for dependencies via the reverse column.
+    self.apply_user_action(["AddTable", "Owners", [{"id": "Name", "type": "Text"}]])
+    self.apply_user_action(["AddTable", "Pets", [{"id": "Owner", "type": "Ref:Owners"},
+                                                 {"id": "Age", "type": "Numeric"}]])
+    self.apply_user_action(["BulkAddRecord", "Owners", [1, 2], {"Name": ["Alice", "Bob"]}])
+    self.apply_user_action(["BulkAddRecord", "Pets", list(range(1, 201)),
+                            {"Owner": [1, 2] * 100, "Age": [1] * 200}])
+    self.apply_user_action(["AddReverseColumn", "Pets", "Owner"])
+    self.add_column("Owners", "Ages", formula="sum($Pets.Age)")
+
+    def assert_pets(alice_pets, bob_pets):
+      self.assertTableData("Owners", cols="subset", data=[
+        ["id", "Name", "Pets"],
+        [1, "Alice", alice_pets],
+        [2, "Bob", bob_pets],
+      ])
+
+    odd, even = list(range(1, 201, 2)), list(range(2, 201, 2))
+    assert_pets(odd, even)
+
+    # A small change.
+    self.apply_user_action(["BulkUpdateRecord", "Pets", [3, 4], {"Owner": [2, 1]}])
+    assert_pets(sorted(set(odd) - {3} | {4}), sorted(set(even) - {4} | {3}))
+    self.apply_user_action(["UpdateRecord", "Pets", 3, {"Age": 10}])
+    self.assertTableData("Owners", cols="subset", data=[
+      ["id", "Ages"],
+      [1, 100],
+      [2, 109],
+    ])
+
+    # A large change.
+    self.apply_user_action(["BulkUpdateRecord", "Pets", list(range(1, 101)), {"Owner": [2] * 100}])
+    assert_pets([r for r in odd if r > 100], list(range(1, 101)) + [r for r in even if r > 100])
+
+    # A new record.
+    self.apply_user_action(["AddRecord", "Pets", None, {"Owner": 1}])
+    assert_pets([r for r in odd if r > 100] + [201],
+                list(range(1, 101)) + [r for r in even if r > 100])
+
+  def test_reverse_value_out_of_sync(self):
+    # A reverse value that doesn't match the references to it (e.g. as loaded from an
+    # inconsistent document) gets rebuilt from the references on the next change to it.
+    self.loadReverseSample()
+    self.add_record("Projects", Name="Frontend", Owner=alice)
+    self.engine.tables["People"].get_column("Projects").set(alice, [backend, 3])
+    self.add_record("Projects", Name="Docs", Owner=alice)
+    self.assertTableData("People", cols="subset", data=[
+      ["id", "Name", "Projects"],
+      [alice, "Alice", [apps, 3, 4]],
+      [bob, "Bob", [backend]],
+    ])
 
 if __name__ == "__main__":
   unittest.main()
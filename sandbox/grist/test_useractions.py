@@ -606,10 +606,10 @@ class TestUserActions(test_engine.EngineTestCase):
     # Replace the engine's assert_schema_consistent() method with a mocked version.
     orig_method = self.engine.assert_schema_consistent
     count_calls = [0]
-    def override(self):   # pylint: disable=unused-argument
+    def override(self, table_ids=None):   # pylint: disable=unused-argument
       count_calls[0] += 1
       # pylint: disable=not-callable
-      orig_method()
+      orig_method(table_ids)
     self.engine.assert_schema_consistent = types.MethodType(override, self.engine)
 
     # Do a non-schema action to ensure it doesn't get called.
@@ -1438,6 +1438,64 @@ class TestUserActions(test_engine.EngineTestCase):
          "999",
        ]}]]})
 
+  def test_bulk_remove_with_references(self):
+    # Removing records in bulk should clear references to them, update lookups, and keep the
+    # reference relations consistent; undo should restore everything.
+    sample = testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Table1", [
+          [1, "name",    "Text",           False, "", "name",    ""],
+          [2, "ref",     "Ref:Table1",     False, "", "ref",     ""],
+          [3, "reflist", "RefList:Table1", False, "", "reflist", ""],
+          [4, "count",   "Int",            True,
+           "len(Table1.lookupRecords(ref=$id)) + len($reflist)", "count", ""],
+        ]],
+      ],
+      "DATA": {
+        "Table1": [
+          ["id", "name", "ref", "reflist"],
+          [1,    "a",    2,     [2, 3]],
+          [2,    "b",    3,     [1, 3, 4]],
+          [3,    "c",    4,     None],
+          [4,    "d",    0,     [3]],
+        ],
+      }
+    })
+    self.load_sample(sample)
+    self.assertTableData('Table1', cols="subset", data=[
+      ["id", "name", "ref", "reflist",  "count"],
+      [1,    "a",    2,     [2, 3],     2],
+      [2,    "b",    3,     [1, 3, 4],  4],
+      [3,    "c",    4,     None,       1],
+      [4,    "d",    0,     [3],        2],
+    ])
+
+    out_actions = self.apply_user_action(["BulkRemoveRecord", "Table1", [3, 4]])
+    self.assertPartialOutActions(out_actions, {'stored': [
+      ["BulkRemoveRecord", "Table1", [3, 4]],
+      ["UpdateRecord", "Table1", 2, {"ref": 0}],
+      ["BulkUpdateRecord", "Table1", [1, 2], {"reflist": [["L", 2], ["L", 1]]}],
+      ["BulkUpdateRecord", "Table1", [1, 2], {"count": [1, 2]}],
+    ]})
+    self.assertTableData('Table1', cols="subset", data=[
+      ["id", "name", "ref", "reflist",  "count"],
+      [1,    "a",    2,     [2],        1],
+      [2,    "b",    0,     [1],        2],
+    ])
+    relation = self.engine.tables['Table1'].get_column('ref')._relation
+    self.assertEqual(relation.get_affected_rows([3, 4]), set())
+    self.assertEqual(relation.get_affected_rows([2]), {1})
+
+    self.apply_undo_actions(out_actions.undo)
+    self.assertTableData('Table1', cols="subset", data=[
+      ["id", "name", "ref", "reflist",  "count"],
+      [1,    "a",    2,     [2, 3],     2],
+      [2,    "b",    3,     [1, 3, 4],  4],
+      [3,    "c",    4,     None,       1],
+      [4,    "d",    0,     [3],        2],
+    ])
+    self.assertEqual(relation.get_affected_rows([3, 4]), {2, 3})
+
   def test_num_rows(self):
     self.load_sample(testutil.parse_test_sample({
       "SCHEMA": [
@@ -1611,6 +1669,44 @@ class TestUserActions(test_engine.EngineTestCase):
       # Revert the monkeypatch
       datetime.datetime = original
 
+  def test_update_current_date(self):
+    # Formulas using TODAY() only get recalculated when the date changes, not on every update.
+    self.load_sample(self.sample)
+    self.apply_user_action(["AddEmptyTable", None])
+    self.add_column('Table1', 'today', isFormula=True, formula='TODAY()', type='Any')
+
+    import datetime
+    original = datetime.datetime
+    class FakeDatetime(object):
+      current = original(2024, 5, 1, 10, 0)
+
+      @classmethod
+      def now(cls, tz=None):
+        return cls.current.replace(tzinfo=tz)
+
+    datetime.datetime = FakeDatetime
+    try:
+      self.add_record('Table1')
+      self.assertTableData('Table1', cols="subset", data=[
+        ["id", "today"],
+        [1, datetime.date(2024, 5, 1)],
+      ])
+
+      FakeDatetime.current = original(2024, 5, 1, 23, 59)
+      out_actions = self.apply_user_action(["UpdateCurrentTime"])
+      self.assertOutActions(out_actions, {})
+      self.assertEqual(out_actions.calls, {})
+
+      FakeDatetime.current = original(2024, 5, 2, 0, 1)
+      out_actions = self.apply_user_action(["UpdateCurrentTime"])
+      self.assertEqual(out_actions.calls, {"Table1": {"today": 1}})
+      self.assertTableData('Table1', cols="subset", data=[
+        ["id", "today"],
+        [1, datetime.date(2024, 5, 2)],
+      ])
+    finally:
+      datetime.datetime = original
+
   def test_duplicate_table(self):
     self.load_sample(self.sample)
 
@@ -0,0 +1,86 @@
+import io
+import os
+import unittest
+
+from unittest import mock
+
+import actions
+import engine
+import sandbox
+import test_engine
+import testutil
+import workers
+
+
+class TestWorkers(unittest.TestCase):
+  def test_map_in_workers(self):
+    self.assertEqual(workers.map_in_workers(sum, [[1, 2], [3], []]), [3, 3, 0])
+    # Each call runs in a separate process.
+    pids = workers.map_in_workers(lambda _: os.getpid(), [1, 2])
+    self.assertNotIn(os.getpid(), pids)
+    self.assertEqual(len(set(pids)), 2)
+
+  def test_failures(self):
+    # A failed call or an unpicklable result give None, without affecting other calls.
+    with self.assertLogs(workers.log, "WARNING"):
+      self.assertEqual(workers.map_in_workers(lambda x: 1 // x, [1, 0, 2]), [1, None, 0])
+      self.assertEqual(workers.map_in_workers(lambda x: x or (lambda: 1), [0, 5]), [None, 5])
+
+  def test_no_external_calls(self):
+    # Children can't send anything to JS: that would interfere with the parent's messages.
+    pipes = sandbox.Sandbox(io.BytesIO(), io.BytesIO())
+    def call_hello(_):
+      try:
+        return pipes.call_external("hello")
+      except Exception as e:   # pylint: disable=broad-except
+        return str(e)
+    self.assertEqual(workers.map_in_workers(call_hello, [1]),
+                     ["Can't call 'hello' from a worker process"])
+
+
+class TestFormulaWorkers(test_engine.EngineTestCase):
+  def setUp(self):
+    super(TestFormulaWorkers, self).setUp()
+    patcher = mock.patch.object(engine, 'WORKERS_MIN_ROWS', 10)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def test_formula_workers(self):
+    self.load_sample(testutil.parse_test_sample({
+      "SCHEMA": [
+        [1, "Items", [
+          [1, "Name",   "Text",     False],
+          [2, "Price",  "Numeric",  False],
+        ]],
+      ],
+      "DATA": {"Items": [["id", "Name", "Price"]]}
+    }))
+    self.engine.formula_workers = 3
+    row_ids = list(range(1, 101))
+    self.engine.load_table(actions.TableData("Items", row_ids, {
+      "Name": ["item%d" % r for r in row_ids],
+      "Price": [float(r) for r in row_ids],
+    }))
+
+    with mock.patch.object(workers, 'map_in_workers', wraps=workers.map_in_workers) as m:
+      self.add_column("Items", "Upper", formula="$Name.upper()")
+      self.assertEqual(m.call_count, 1)
+      # The first row gets evaluated here, the rest split among the workers.
+      self.assertEqual([len(s) for s in m.call_args[0][1]], [33, 33, 33])
+
+      # Rows for which a worker can't return a value get evaluated here as usual.
+      self.add_column("Items", "Price2", formula="1 / ($Price - 50) if $id % 40 else [$Price]")
+      self.assertEqual(m.call_count, 2)
+
+      # Formulas that depend on other records don't get evaluated in workers.
+      self.add_column("Items", "Prev", formula="Items.lookupOne(id=$id - 1).Name")
+      self.assertEqual(m.call_count, 2)
+
+    data = self.engine.fetch_table("Items", query={"id": [1, 40, 50, 51, 100]}).columns
+    self.assertEqual(data["Upper"], ["ITEM1", "ITEM40", "ITEM50", "ITEM51", "ITEM100"])
+    self.assertEqual(data["Price2"][:2] + data["Price2"][3:], [1 / -49, [40.0], 1.0, 0.02])
+    self.assertIsInstance(data["Price2"][2].error, ZeroDivisionError)
+    self.assertEqual(data["Prev"], ["", "item39", "item49", "item50", "item99"])
+
+if __name__ == "__main__":
+  unittest.main()
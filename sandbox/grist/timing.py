@@ -6,6 +6,8 @@ class Timing(object):
   def __init__(self):
     self._items = {}
     self._marks_stack = []
+    # Maps nodes to [hits, misses] counts of their columns' rich-value caches.
+    self._cache_stats = {}
 
   @contextlib.contextmanager
   def measure(self, key):
@@ -32,9 +34,15 @@ class Timing(object):
   def mark(self, mark_name):
     self._marks_stack.append((mark_name, time.time()))
 
+  def record_cache_stats(self, key, hits, misses):
+    counts = self._cache_stats.setdefault(key, [0, 0])
+    counts[0] += hits
+    counts[1] += misses
+
   def get(self, clear = True):
     # Copy it and clear immediately if requested.
     timing_log = self._items.copy()
+    cache_stats = self._cache_stats.copy()
     if clear:
       self.clear()
     # Stats will contain a json like structure with table_id, col_id, sum, count, average, max
@@ -47,6 +55,7 @@ class Timing(object):
       if isinstance(key, tuple):
         stats.append({"tableId": key[0], "colId": key[1], "sum": t.sum, "count": t.count,
                       "average": t.average, "max": t.max})
+        _add_cache_stats(stats[-1], cache_stats.pop(key, None))
       else:
         # Create a marks array for the last node or append to the existing one.
         if stats:
@@ -56,6 +65,12 @@ class Timing(object):
             "count": t.count, "average": t.average,
             "max": t.max
           }]
+
+    # Include columns that were only read (e.g. data columns), for their rich-value cache stats.
+    for key, counts in sorted(cache_stats.items()):
+      stats.append({"tableId": key[0], "colId": key[1], "sum": 0, "count": 0,
+                    "average": 0, "max": 0})
+      _add_cache_stats(stats[-1], counts)
     return stats
 
   def dump(self):
@@ -73,7 +88,12 @@ class Timing(object):
 
   def clear(self):
     self._items.clear()
+    self._cache_stats.clear()
+
 
+def _add_cache_stats(node_stats, counts):
+  if counts:
+    node_stats["cacheHits"], node_stats["cacheMisses"] = counts
 
 
 # An implementation that adds minimal overhead.
@@ -85,6 +105,9 @@ class DummyTiming(object):
   def mark(self, mark_name):
     pass
 
+  def record_cache_stats(self, key, hits, misses):
+    pass
+
   def dump(self):
     pass
 
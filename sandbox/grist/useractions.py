@@ -341,8 +341,15 @@ class UserActions(object):
 
   @useraction
   def ApplyUndoActions(self, undo_actions):
+    self.doApplyUndoActions([actions.action_from_repr(a) for a in undo_actions])
+
+  def doApplyUndoActions(self, undo_actions):
+    """
+    Applies undo actions given as action objects (rather than as their repr), in reverse order.
+    This is used internally to revert actions, without encoding and decoding all their values.
+    """
     for undo_action in reversed(undo_actions):
-      self._do_doc_action(actions.action_from_repr(undo_action))
+      self._do_doc_action(undo_action)
 
   @useraction
   def Calculate(self):
@@ -379,6 +386,10 @@ class UserActions(object):
           node = depend.Node(table_id, col_id)
           engine.dep_graph.invalidate_deps(node, row_ids, engine.recompute_map)
 
+    # Keep the responses for reuse. This also invalidates other cells which asked for the same
+    # requests while they were already being made.
+    engine.cache_request_responses(responses)
+
   #----------------------------------------
   # User actions on records.
   #----------------------------------------
@@ -403,6 +414,47 @@ class UserActions(object):
     # There doesn't seem any need to return the big array of ids.
     self.doBulkAddOrReplace(table_id, row_ids, column_values, replace=True)
 
+  @useraction
+  def SyncTableData(self, table_id, row_ids, column_values):
+    """
+    Like ReplaceTableData, leaves the table with exactly the given records, but only applies the
+    differences: records not in row_ids are removed, records with new (or None) row_ids are added,
+    and existing records are updated only in those cells whose values actually change. This keeps
+    the resulting actions small and avoids recomputing formulas for unchanged records, which
+    matters for periodic syncs that send mostly the same data.
+
+    Unlike ReplaceTableData, columns not included in column_values keep their values in existing
+    records, and get default values in added ones.
+    """
+    column_values = actions.decode_bulk_values(column_values)
+    for col_id, values in column_values.items():
+      column_values[col_id] = self._ensure_column_accepts_data(table_id, col_id, values)
+
+    table = self._engine.tables[table_id]
+    new_row_ids = set(row_ids)
+    remove_row_ids = [r for r in table.row_ids if r not in new_row_ids]
+    update_indices = []
+    add_indices = []
+    for i, row_id in enumerate(row_ids):
+      exists = row_id is not None and row_id in table.row_ids
+      (update_indices if exists else add_indices).append(i)
+
+    if remove_row_ids:
+      self.BulkRemoveRecord(table_id, remove_row_ids)
+
+    if update_indices:
+      # doBulkUpdateRecord trims the update to those rows and columns that actually change.
+      self._BulkUpdateRecord_decoded(
+        table_id,
+        [row_ids[i] for i in update_indices],
+        {col_id: [values[i] for i in update_indices] for col_id, values in column_values.items()})
+
+    if add_indices:
+      method = self._overrides.get(('BulkAddRecord', table_id), self.doBulkAddOrReplace)
+      method(table_id,
+             [row_ids[i] for i in add_indices],
+             {col_id: [values[i] for i in add_indices] for col_id, values in column_values.items()})
+
   def doBulkAddOrReplace(self, table_id, row_ids, column_values, replace=False):
     table = self._engine.tables[table_id]
     next_row_id = 1 if replace else table.next_row_id()
@@ -904,7 +956,9 @@ class UserActions(object):
     # We'll maintain a list of textbuilder patches for each affected col_rec.
     patches_map = {}
 
-    for (formula_info, pos, table_id, col_id) in self._engine.gencode.grist_names():
+    # Only formulas that mention any of the renamed names need to be parsed.
+    names = {col_id or table_id for (table_id, col_id) in renames}
+    for (formula_info, pos, table_id, col_id) in self._engine.gencode.grist_names(names):
       # Check if we are seeing a mention of a column that's getting renamed.
       new_name = renames.get((table_id, col_id))
       if new_name:
@@ -0,0 +1,84 @@
+"""
+Runs work in forked child processes, to use more than one CPU core for CPU-bound work like
+evaluating a formula for a large number of rows.
+
+A forked child starts with a copy of the parent's memory (shared copy-on-write by the OS), so it
+can use the engine's state as is, without any of it being serialized. Only the results are sent
+back to the parent, pickled through a pipe. Changes made by the child to its copy of the state are
+not seen by the parent, so the work must be free of side effects that matter.
+"""
+import gc
+import logging
+import os
+import pickle
+import random
+
+import sandbox
+
+log = logging.getLogger(__name__)
+
+
+def map_in_workers(func, shards):
+  """
+  Calls func(shard) for each of the given shards, each in its own forked child process, and
+  returns the list of results. In place of the result of any call that failed (including when
+  forking isn't supported, or the result couldn't be pickled), the list contains None.
+  """
+  if not hasattr(os, 'fork'):
+    return [None] * len(shards)
+
+  # Objects tracked by the garbage collector would get their pages copied in children as soon as
+  # a collection touches them. Freezing them moves them out of the collector's reach.
+  gc.freeze()
+  try:
+    children = [_start_child(func, shard) for shard in shards]
+  finally:
+    gc.unfreeze()
+  return [_get_child_result(pid, read_fd) for (pid, read_fd) in children]
+
+
+def _start_child(func, shard):
+  """
+  Forks a child process to call func(shard) and write out the pickled result. Returns the pair
+  (pid, read_fd) for the child, or (None, None) if it couldn't be started.
+  """
+  read_fd, write_fd = os.pipe()
+  try:
+    pid = os.fork()
+  except OSError as e:
+    log.warning("workers: can't start a child process: %s", e)
+    os.close(read_fd)
+    os.close(write_fd)
+    return (None, None)
+
+  if pid:
+    os.close(write_fd)
+    return (pid, read_fd)
+
+  # In the child. Whatever happens, it must exit here rather than return into the parent's code,
+  # and without running exit handlers or flushing output buffers it shares with the parent.
+  status = 1
+  try:
+    os.close(read_fd)
+    # Children shouldn't all produce the same sequence of random numbers.
+    random.seed()
+    # The child shares the pipes to JS with the parent, and must leave them to the parent.
+    sandbox.block_external_calls()
+    data = pickle.dumps(func(shard), pickle.HIGHEST_PROTOCOL)
+    with os.fdopen(write_fd, 'wb') as f:
+      f.write(data)
+    status = 0
+  finally:
+    os._exit(status)   # pylint: disable=protected-access
+
+
+def _get_child_result(pid, read_fd):
+  if pid is None:
+    return None
+  with os.fdopen(read_fd, 'rb') as f:
+    data = f.read()
+  _, status = os.waitpid(pid, 0)
+  if status != 0:
+    log.warning("workers: child process failed with status %s", status)
+    return None
+  return pickle.loads(data)
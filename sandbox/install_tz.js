@@ -1,20 +1,34 @@
 /**
  * This script converts the timezone data from moment-timezone to marshalled format, for fast
- * loading by Python.
+ * loading by Python. The data for each zone is marshalled separately, and preceded by an index,
+ * so that Python can decode only the zones it needs (see _TzDataFile in sandbox/grist/moment.py).
  */
 const marshal = require("app/common/marshal");
 const fse = require("fs-extra");
 const moment = require("moment-timezone");
 const DEST_FILE = "sandbox/grist/tzdata.data";
 
+function marshalValue(value) {
+  const marshaller = new marshal.Marshaller({version: 2});
+  marshaller.marshal(value);
+  return marshaller.dumpAsBuffer();
+}
+
 function main() {
-  const zones = moment.tz.names().map((name) => {
+  const index = [];
+  const zoneBuffers = [];
+  let offset = 0;
+  for (const name of moment.tz.names()) {
     const z = moment.tz.zone(name);
-    return marshal.wrap("TUPLE", [z.name, z.abbrs, z.offsets, z.untils]);
-  });
-  const marshaller = new marshal.Marshaller({version: 2});
-  marshaller.marshal(zones);
-  const contents = marshaller.dumpAsBuffer();
+    const buf = marshalValue(marshal.wrap("TUPLE", [z.name, z.abbrs, z.offsets, z.untils]));
+    index.push(marshal.wrap("TUPLE", [name, offset, offset + buf.length]));
+    zoneBuffers.push(buf);
+    offset += buf.length;
+  }
+  const indexBuf = marshalValue(index);
+  const header = Buffer.alloc(4);
+  header.writeUInt32LE(indexBuf.length, 0);
+  const contents = Buffer.concat([header, indexBuf, ...zoneBuffers]);
 
   return fse.writeFile(DEST_FILE, contents);
 }